@@ -1,15 +1,25 @@
-from flask import Flask, jsonify, request
+from flask import Flask, Response, jsonify, request
 from flask_cors import CORS
 from flask_sqlalchemy import SQLAlchemy
 from flask_jwt_extended import JWTManager, jwt_required, create_access_token, get_jwt_identity
 from werkzeug.security import generate_password_hash, check_password_hash
+from sqlalchemy import DDL, and_, event, func, literal, or_, text
+from sqlalchemy.orm import validates
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.exc import IntegrityError
 from datetime import datetime, timedelta
-import json, os
-from urllib.parse import quote_plus
-from sports_api import SportsAPIIntegration, get_mock_sports_data
-from performance import monitor_performance, cache_result, rate_limit, get_performance_report
+from decimal import Decimal
+import base64, json, os, re
+from urllib.parse import quote_plus, urlencode
+from sports_api import SportsAPIIntegration, get_mock_sports_data, upstream_client
+from performance import (cache_result, rate_limit, get_performance_report, invalidate_tag, tagged_ttl,
+                         versioned_snapshot, instrument_app, render_metrics, sampling_profiler, span,
+                         MonitoredQueuePool, OPENMETRICS_CONTENT_TYPE)
+from replicas import RoutingSession, read_only, replica_router, REPLICA_BIND
+from geocoding import zip_centroids, haversine_miles, grid_cell, grid_cell_ranges
 
 app = Flask(__name__)
+instrument_app(app)
 
 # Database configuration
 
@@ -30,6 +40,13 @@ if not DATABASE_URL:
 app.config['SECRET_KEY'] = os.environ.get('SECRET_KEY', 'your-secret-key-change-in-production')
 app.config['SQLALCHEMY_DATABASE_URI'] = DATABASE_URL
 app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
+
+# Optional read replica; read-only views query it while it is healthy
+DATABASE_REPLICA_URL = os.environ.get('DATABASE_REPLICA_URL')
+if DATABASE_REPLICA_URL:
+    app.config['SQLALCHEMY_BINDS'] = {REPLICA_BIND: DATABASE_REPLICA_URL}
+app.config['REPLICA_MAX_LAG_SECONDS'] = float(os.environ.get('REPLICA_MAX_LAG_SECONDS', 5))
+app.config['READ_YOUR_WRITES_SECONDS'] = float(os.environ.get('READ_YOUR_WRITES_SECONDS', 5))
 app.config['JWT_SECRET_KEY'] = os.environ.get('JWT_SECRET_KEY', 'jwt-secret-string')
 app.config['JWT_ACCESS_TOKEN_EXPIRES'] = timedelta(hours=24)
 
@@ -38,15 +55,77 @@ app.config['SQLALCHEMY_ENGINE_OPTIONS'] = {
     'pool_size': 20,
     'pool_recycle': 3600,
     'pool_pre_ping': True,
-    'max_overflow': 30
+    'max_overflow': 30,
+    'poolclass': MonitoredQueuePool
 }
 
-CORS(app)
-db = SQLAlchemy(app)
+CORS(app, expose_headers=['X-Next-Cursor', 'Link'])
+db = SQLAlchemy(app, session_options={'class_': RoutingSession})
+replica_router.init_app(app, db)
 jwt = JWTManager(app)
 
 DATA_DIR = os.path.join(os.path.dirname(__file__), "data")
 
+# Cache tag of everything derived from the programs table; invalidated on writes
+PROGRAMS_CACHE_TAG = 'programs'
+FAMILIES_CACHE_TAG = 'families'
+
+# Upper bound stored for open-ended ranges such as "14+" or "All ages"
+MAX_PROGRAM_AGE = 99
+
+def parse_age_range(value):
+    """
+    Parse a free-text age range into (min_age, max_age)
+    Handles "8-12", "8 to 12", "Ages 6-10", "14+", "U10", "5" and "All ages";
+    anything else yields (None, None)
+    """
+    if not value:
+        return None, None
+    
+    text_value = value.strip().lower()
+    if text_value in ('all', 'all ages'):
+        return 0, MAX_PROGRAM_AGE
+    
+    numbers = [int(n) for n in re.findall(r'\d+', text_value)]
+    if not numbers:
+        return None, None
+    
+    if len(numbers) >= 2:
+        low, high = numbers[0], numbers[1]
+        return min(low, high), max(low, high)
+    
+    age = numbers[0]
+    if text_value.endswith('+') or 'and up' in text_value or 'over' in text_value:
+        return age, MAX_PROGRAM_AGE
+    if text_value.startswith('u') or 'under' in text_value:
+        return 0, max(age - 1, 0)
+    return age, age
+
+# Catalog facets: (label, low, high) with high exclusive for prices and
+# inclusive for ages; None means unbounded
+PRICE_BUCKETS = [('0-50', 0, 50), ('50-100', 50, 100), ('100-200', 100, 200), ('200+', 200, None)]
+AGE_BANDS = [('0-5', 0, 5), ('6-9', 6, 9), ('10-13', 10, 13), ('14-18', 14, 18), ('19+', 19, MAX_PROGRAM_AGE)]
+
+def price_bucket(price):
+    try:
+        price = float(price)
+    except (TypeError, ValueError):
+        return ''
+    for label, low, high in PRICE_BUCKETS:
+        if price >= low and (high is None or price < high):
+            return label
+    return ''
+
+def age_band_mask(min_age, max_age):
+    """Bitmask of the AGE_BANDS an age range overlaps (bit i = AGE_BANDS[i])"""
+    if min_age is None or max_age is None:
+        return 0
+    mask = 0
+    for i, (_, low, high) in enumerate(AGE_BANDS):
+        if min_age <= high and max_age >= low:
+            mask |= 1 << i
+    return mask
+
 # Database Models
 class User(db.Model):
     __tablename__ = 'users'
@@ -66,10 +145,12 @@ class User(db.Model):
     families = db.relationship('Family', backref='user', lazy=True, cascade='all, delete-orphan')
     
     def set_password(self, password):
-        self.password_hash = generate_password_hash(password)
+        with span('password_hash'):
+            self.password_hash = generate_password_hash(password)
     
     def check_password(self, password):
-        return check_password_hash(self.password_hash, password)
+        with span('password_check'):
+            return check_password_hash(self.password_hash, password)
     
     def __repr__(self):
         return f'<User {self.email}>'
@@ -84,9 +165,16 @@ class Family(db.Model):
     city = db.Column(db.String(50))
     state = db.Column(db.String(50))
     zip_code = db.Column(db.String(10))
+    latitude = db.Column(db.Float)  # Geocoded from zip_code/city, see geocoding.py
+    longitude = db.Column(db.Float)
     created_at = db.Column(db.DateTime, default=datetime.utcnow, nullable=False)
     updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
     
+    def geocode(self):
+        point = zip_centroids.geocode(zip_code=self.zip_code, city=self.city, state=self.state)
+        if point:
+            self.latitude, self.longitude = point
+    
     def __repr__(self):
         return f'<Family {self.family_name}>'
 
@@ -94,13 +182,19 @@ class Program(db.Model):
     __tablename__ = 'programs'
     
     id = db.Column(db.Integer, primary_key=True)
-    name = db.Column(db.String(100), nullable=False, index=True)
+    name = db.Column(db.String(100), nullable=False)
     age_range = db.Column(db.String(20))
+    min_age = db.Column(db.Integer)  # Parsed from age_range, see parse_age_range
+    max_age = db.Column(db.Integer)
     price = db.Column(db.Numeric(10, 2))  # Use Numeric for precise decimal handling in PostgreSQL
     location = db.Column(db.String(200))
+    zip_code = db.Column(db.String(10))
+    latitude = db.Column(db.Float)  # Geocoded from zip_code/location, see geocoding.py
+    longitude = db.Column(db.Float)
+    geo_cell = db.Column(db.Integer, index=True)  # Spatial grid cell for radius search
     description = db.Column(db.Text)
-    sport_type = db.Column(db.String(50), index=True)
-    organization = db.Column(db.String(100), index=True)
+    sport_type = db.Column(db.String(50))
+    organization = db.Column(db.String(100))
     external_id = db.Column(db.String(50), unique=True)  # External API ID
     registration_url = db.Column(db.String(500))
     start_date = db.Column(db.Date)
@@ -109,9 +203,85 @@ class Program(db.Model):
     created_at = db.Column(db.DateTime, default=datetime.utcnow, nullable=False)
     updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
     
+    __table_args__ = (
+        # Keyset pagination: the catalog is walked in (name, id) or id order,
+        # optionally restricted to active programs or a single sport/organization
+        db.Index('ix_programs_name_id', 'name', 'id'),
+        db.Index('ix_programs_active_id', 'is_active', 'id'),
+        db.Index('ix_programs_sport_type_id', 'sport_type', 'id'),
+        db.Index('ix_programs_organization_id', 'organization', 'id'),
+        db.Index('ix_programs_price_id', 'price', 'id'),
+        # "Programs for my 9-year-old": min_age <= 9 AND max_age >= 9
+        db.Index('ix_programs_age', 'min_age', 'max_age'),
+    )
+    
+    @validates('age_range')
+    def validate_age_range(self, key, value):
+        self.min_age, self.max_age = parse_age_range(value)
+        return value
+    
+    def geocode(self):
+        point = zip_centroids.geocode(zip_code=self.zip_code, text=self.location)
+        if point:
+            self.latitude, self.longitude = point
+            self.geo_cell = grid_cell(*point)
+    
     def __repr__(self):
         return f'<Program {self.name}>'
 
+class ProgramFacetCount(db.Model):
+    """Active program counts per facet combination, maintained as programs are written"""
+    __tablename__ = 'program_facet_counts'
+    
+    id = db.Column(db.Integer, primary_key=True)
+    sport_type = db.Column(db.String(50), nullable=False, default='')
+    organization = db.Column(db.String(100), nullable=False, default='')
+    price_bucket = db.Column(db.String(20), nullable=False, default='')
+    age_mask = db.Column(db.Integer, nullable=False, default=0)  # See age_band_mask
+    count = db.Column(db.Integer, nullable=False, default=0)
+    
+    __table_args__ = (
+        db.UniqueConstraint('sport_type', 'organization', 'price_bucket', 'age_mask',
+                            name='uq_program_facet_counts_key'),
+    )
+    
+    def __repr__(self):
+        return f'<ProgramFacetCount {self.sport_type}/{self.organization} {self.count}>'
+
+class SyncState(db.Model):
+    """Where the last successful program sync of an organization left off"""
+    __tablename__ = 'sync_states'
+    
+    id = db.Column(db.Integer, primary_key=True)
+    organization = db.Column(db.String(100), unique=True, nullable=False)  # Key of SportsAPIIntegration.api_configs
+    etag = db.Column(db.String(200))
+    last_modified = db.Column(db.String(100))  # HTTP date, sent back verbatim
+    cursor = db.Column(db.String(100))  # updated_since value for delta requests
+    synced_at = db.Column(db.DateTime, default=datetime.utcnow, nullable=False)
+    
+    def to_dict(self):
+        return {'etag': self.etag, 'last_modified': self.last_modified, 'cursor': self.cursor}
+    
+    def __repr__(self):
+        return f'<SyncState {self.organization}>'
+
+@event.listens_for(Family, 'before_insert')
+@event.listens_for(Program, 'before_insert')
+def geocode_before_insert(mapper, connection, target):
+    if target.latitude is None:
+        target.geocode()
+
+# Trigram GIN indexes for fuzzy search (PostgreSQL only, needs pg_trgm)
+PROGRAM_TRGM_INDEXES = [
+    "CREATE EXTENSION IF NOT EXISTS pg_trgm",
+    "CREATE INDEX IF NOT EXISTS ix_programs_name_trgm ON programs USING gin (name gin_trgm_ops)",
+    "CREATE INDEX IF NOT EXISTS ix_programs_description_trgm ON programs USING gin (description gin_trgm_ops)",
+    "CREATE INDEX IF NOT EXISTS ix_programs_location_trgm ON programs USING gin (location gin_trgm_ops)",
+    "CREATE INDEX IF NOT EXISTS ix_programs_organization_trgm ON programs USING gin (organization gin_trgm_ops)",
+]
+for statement in PROGRAM_TRGM_INDEXES:
+    event.listen(Program.__table__, 'after_create', DDL(statement).execute_if(dialect='postgresql'))
+
 def read_json(file):
     with open(os.path.join(DATA_DIR, file), "r") as f:
         return json.load(f)
@@ -120,8 +290,114 @@ def write_json(file, data):
     with open(os.path.join(DATA_DIR, file), "w") as f:
         json.dump(data, f, indent=2)
 
+def backfill_program_ages(batch_size=1000):
+    """Populate min_age/max_age for rows created before the columns existed"""
+    updated = 0
+    last_id = 0
+    while True:
+        rows = db.session.query(Program.id, Program.age_range) \
+            .filter(Program.id > last_id, Program.age_range.isnot(None), Program.min_age.is_(None)) \
+            .order_by(Program.id) \
+            .limit(batch_size) \
+            .all()
+        if not rows:
+            break
+        
+        mappings = []
+        for row in rows:
+            min_age, max_age = parse_age_range(row.age_range)
+            if min_age is not None:
+                mappings.append({'id': row.id, 'min_age': min_age, 'max_age': max_age})
+        if mappings:
+            db.session.execute(db.update(Program), mappings)
+        db.session.commit()
+        
+        updated += len(mappings)
+        last_id = rows[-1].id
+    return updated
+
+def facet_key(program):
+    return {
+        'sport_type': program.sport_type or '',
+        'organization': program.organization or '',
+        'price_bucket': price_bucket(program.price),
+        'age_mask': age_band_mask(program.min_age, program.max_age)
+    }
+
+def record_program_facets(program, delta=1):
+    """
+    Add a program to the facet aggregate in the caller's transaction
+    Only active programs are counted, matching what the catalog shows
+    """
+    if program.is_active is False:
+        return
+    
+    key = facet_key(program)
+    table = ProgramFacetCount.__table__
+    dialect = db.engine.dialect.name
+    if dialect in ('postgresql', 'sqlite'):
+        insert = postgresql.insert if dialect == 'postgresql' else sqlite.insert
+        statement = insert(table).values(count=delta, **key)
+        statement = statement.on_conflict_do_update(
+            index_elements=['sport_type', 'organization', 'price_bucket', 'age_mask'],
+            set_={'count': table.c.count + delta}
+        )
+        db.session.execute(statement)
+        return
+    
+    # Other databases: update the row, else insert it; if a concurrent writer
+    # inserted it first, the unique constraint fails the insert and we update
+    update = table.update() \
+        .where(*[table.c[column] == value for column, value in key.items()]) \
+        .values(count=table.c.count + delta)
+    if db.session.execute(update).rowcount:
+        return
+    try:
+        with db.session.begin_nested():
+            db.session.execute(table.insert().values(count=delta, **key))
+    except IntegrityError:
+        db.session.execute(update)
+
+def rebuild_program_facets():
+    """Recompute the facet aggregate from scratch (backfill or repair)"""
+    counts = {}
+    rows = db.session.query(Program.sport_type, Program.organization, Program.price,
+                            Program.min_age, Program.max_age) \
+        .filter(Program.is_active.is_(True)) \
+        .yield_per(1000)
+    for row in rows:
+        key = tuple(facet_key(row).items())
+        counts[key] = counts.get(key, 0) + 1
+    
+    ProgramFacetCount.query.delete()
+    db.session.add_all(ProgramFacetCount(count=count, **dict(key)) for key, count in counts.items())
+    db.session.commit()
+    return len(counts)
+
+def geocode_locations(batch_size=1000):
+    """Offline geocoding step: fill in coordinates for programs and families that lack them"""
+    updated = 0
+    for model in (Program, Family):
+        last_id = 0
+        while True:
+            records = model.query \
+                .filter(model.id > last_id, model.latitude.is_(None)) \
+                .order_by(model.id) \
+                .limit(batch_size) \
+                .all()
+            if not records:
+                break
+            
+            for record in records:
+                record.geocode()
+                updated += record.latitude is not None
+            db.session.commit()
+            last_id = records[-1].id
+    return updated
+
 # Authentication Routes
 @app.route("/api/auth/register", methods=["POST"])
+@rate_limit('auth')
 def register():
     try:
         data = request.get_json()
@@ -149,7 +425,7 @@ def register():
         db.session.commit()
         
         # Create access token
-        access_token = create_access_token(identity=user.id)
+        access_token = create_access_token(identity=str(user.id))
         
         return jsonify({
             "message": "User registered successfully",
@@ -166,6 +442,7 @@ def register():
         return jsonify({"error": str(e)}), 500
 
 @app.route("/api/auth/login", methods=["POST"])
+@rate_limit('auth')
 def login():
     try:
         data = request.get_json()
@@ -181,7 +458,7 @@ def login():
         if not user.is_active:
             return jsonify({"error": "Account is deactivated"}), 401
         
-        access_token = create_access_token(identity=user.id)
+        access_token = create_access_token(identity=str(user.id))
         
         return jsonify({
             "message": "Login successful",
@@ -199,9 +476,10 @@ def login():
 
 @app.route("/api/auth/me", methods=["GET"])
 @jwt_required()
+@read_only
 def get_current_user():
     try:
-        user_id = get_jwt_identity()
+        user_id = int(get_jwt_identity())
         user = User.query.get(user_id)
         
         if not user:
@@ -220,22 +498,347 @@ def get_current_user():
         return jsonify({"error": str(e)}), 500
 
 # Program Routes
+DEFAULT_PAGE_SIZE = 50
+MAX_PAGE_SIZE = 200
+
+# Columns returned by the catalog listing; selecting them directly avoids
+# hydrating full ORM objects for every row on the page
+PROGRAM_LIST_COLUMNS = (
+    Program.id,
+    Program.name,
+    Program.age_range,
+    Program.min_age,
+    Program.max_age,
+    Program.price,
+    Program.location,
+    Program.description,
+    Program.sport_type,
+    Program.organization
+)
+
+def serialize_program(row):
+    return {
+        "id": row.id,
+        "name": row.name,
+        "age_range": row.age_range,
+        "min_age": row.min_age,
+        "max_age": row.max_age,
+        "price": row.price,
+        "location": row.location,
+        "description": row.description,
+        "sport_type": row.sport_type,
+        "organization": row.organization
+    }
+
+def encode_cursor(values):
+    raw = json.dumps(values, separators=(',', ':')).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip('=')
+
+def decode_cursor(cursor):
+    try:
+        padded = cursor + '=' * (-len(cursor) % 4)
+        return json.loads(base64.urlsafe_b64decode(padded.encode()))
+    except (ValueError, TypeError):
+        raise ValueError("Invalid cursor")
+
+def parse_number(args, param):
+    try:
+        return float(args[param])
+    except ValueError:
+        raise ValueError(f"{param} must be a number")
+
+def parse_program_filters(args):
+    """Translate catalog query parameters into SQL filter clauses"""
+    clauses = []
+    
+    if args.get('sport_type'):
+        clauses.append(Program.sport_type == args['sport_type'])
+    if args.get('organization'):
+        clauses.append(Program.organization == args['organization'])
+    
+    if args.get('min_price'):
+        clauses.append(Program.price >= parse_number(args, 'min_price'))
+    if args.get('max_price'):
+        clauses.append(Program.price <= parse_number(args, 'max_price'))
+    if args.get('age'):
+        try:
+            age = int(args['age'])
+        except ValueError:
+            raise ValueError("age must be an integer")
+        clauses.append(and_(Program.min_age <= age, Program.max_age >= age))
+    if args.get('age_band'):
+        bands = {label: (low, high) for label, low, high in AGE_BANDS}
+        if args['age_band'] not in bands:
+            raise ValueError(f"age_band must be one of {', '.join(bands)}")
+        low, high = bands[args['age_band']]
+        clauses.append(and_(Program.min_age <= high, Program.max_age >= low))
+    
+    is_active = args.get('is_active', 'true').lower()
+    if is_active in ('true', '1'):
+        clauses.append(Program.is_active.is_(True))
+    elif is_active in ('false', '0'):
+        clauses.append(Program.is_active.is_(False))
+    elif is_active != 'all':
+        raise ValueError("is_active must be true, false or all")
+    
+    return clauses
+
 @app.route("/api/programs", methods=["GET"])
-@monitor_performance
-@cache_result(ttl=300)  # Cache for 5 minutes
+@rate_limit('catalog')
+@versioned_snapshot(PROGRAMS_CACHE_TAG, ttl=tagged_ttl(3600), stale_ttl=300)
+@read_only(cached=True)
 def get_programs():
     try:
-        programs = Program.query.all()
-        return jsonify([{
-            "id": program.id,
-            "name": program.name,
-            "age_range": program.age_range,
-            "price": program.price,
-            "location": program.location,
-            "description": program.description,
-            "sport_type": program.sport_type,
-            "organization": program.organization
-        } for program in programs]), 200
+        try:
+            filters = parse_program_filters(request.args)
+            limit = min(max(int(request.args.get('limit', DEFAULT_PAGE_SIZE)), 1), MAX_PAGE_SIZE)
+        except ValueError as e:
+            return jsonify({"error": str(e)}), 400
+        
+        sort = request.args.get('sort', 'id')
+        if sort not in ('id', 'name'):
+            return jsonify({"error": "sort must be id or name"}), 400
+        
+        query = db.session.query(*PROGRAM_LIST_COLUMNS).filter(*filters)
+        
+        # Keyset pagination: the cursor holds the sort key of the last row
+        # returned, so each page is an index range scan instead of an OFFSET
+        cursor = request.args.get('cursor')
+        if cursor:
+            try:
+                last = decode_cursor(cursor)
+                if sort == 'name':
+                    last_name, last_id = last
+                    query = query.filter(or_(
+                        Program.name > last_name,
+                        and_(Program.name == last_name, Program.id > int(last_id))
+                    ))
+                else:
+                    query = query.filter(Program.id > int(last))
+            except (ValueError, TypeError):
+                return jsonify({"error": "Invalid cursor"}), 400
+        
+        if sort == 'name':
+            query = query.order_by(Program.name, Program.id)
+        else:
+            query = query.order_by(Program.id)
+        
+        # Fetch one extra row to learn whether another page exists
+        rows = query.limit(limit + 1).all()
+        has_more = len(rows) > limit
+        rows = rows[:limit]
+        
+        response = jsonify([serialize_program(row) for row in rows])
+        if has_more:
+            last_row = rows[-1]
+            next_cursor = encode_cursor([last_row.name, last_row.id] if sort == 'name' else last_row.id)
+            next_args = request.args.to_dict()
+            next_args['cursor'] = next_cursor
+            response.headers['X-Next-Cursor'] = next_cursor
+            # Relative: the snapshot is shared by every client, whatever Host header built it
+            response.headers['Link'] = f'<{request.path}?{urlencode(next_args)}>; rel="next"'
+        return response, 200
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+
+# Fuzzy search: fields are matched with pg_trgm word similarity, and a hit
+# in the name counts for more than one buried in the description
+SEARCH_FIELD_WEIGHTS = (
+    (Program.name, 1.0),
+    (Program.organization, 0.8),
+    (Program.location, 0.7),
+    (Program.description, 0.6)
+)
+SEARCH_SIMILARITY_THRESHOLD = 0.3
+DEFAULT_SEARCH_RESULTS = 20
+MAX_SEARCH_RESULTS = 100
+
+def _trigrams(value):
+    """Trigram set of a string, padded per word the way pg_trgm does it"""
+    grams = set()
+    for word in re.findall(r'\w+', (value or '').lower()):
+        padded = f'  {word} '
+        grams.update(padded[i:i + 3] for i in range(len(padded) - 2))
+    return grams
+
+def _search_programs_trgm(q, limit, filters):
+    # The <% operator is what the GIN indexes accelerate; lower its
+    # threshold for this transaction so one or two typos still match
+    db.session.execute(
+        text("SELECT set_config('pg_trgm.word_similarity_threshold', :threshold, true)"),
+        {'threshold': str(SEARCH_SIMILARITY_THRESHOLD)}
+    )
+    score = func.greatest(*[
+        func.word_similarity(q, column) * weight for column, weight in SEARCH_FIELD_WEIGHTS
+    ]).label('score')
+    matches = or_(*[literal(q).op('<%')(column) for column, _ in SEARCH_FIELD_WEIGHTS])
+    
+    rows = db.session.query(*PROGRAM_LIST_COLUMNS, score) \
+        .filter(*filters, matches) \
+        .order_by(score.desc(), Program.id) \
+        .limit(limit) \
+        .all()
+    return [(row, row.score) for row in rows]
+
+def _search_programs_fallback(q, limit, filters):
+    # Databases without pg_trgm (e.g. SQLite in development) approximate
+    # word similarity in Python; this scans the table and is not for production
+    query_grams = _trigrams(q)
+    if not query_grams:
+        return []
+    
+    columns = [column.key for column, _ in SEARCH_FIELD_WEIGHTS]
+    results = []
+    for row in db.session.query(*PROGRAM_LIST_COLUMNS).filter(*filters).yield_per(1000):
+        score = max(
+            len(query_grams & _trigrams(getattr(row, column))) / len(query_grams) * weight
+            for column, (_, weight) in zip(columns, SEARCH_FIELD_WEIGHTS)
+        )
+        if score >= SEARCH_SIMILARITY_THRESHOLD:
+            results.append((row, score))
+    
+    results.sort(key=lambda result: (-result[1], result[0].id))
+    return results[:limit]
+
+def search_programs(q, limit, filters=None):
+    """
+    Return programs ranked by similarity to q, best first; filters are
+    clauses from parse_program_filters, by default active programs only
+    """
+    if filters is None:
+        filters = [Program.is_active.is_(True)]
+    if db.engine.dialect.name == 'postgresql':
+        matches = _search_programs_trgm(q, limit, filters)
+    else:
+        matches = _search_programs_fallback(q, limit, filters)
+    
+    results = []
+    for row, score in matches:
+        program = serialize_program(row)
+        program['score'] = round(float(score), 4)
+        results.append(program)
+    return results
+
+@app.route("/api/programs/search", methods=["GET"])
+@rate_limit('catalog')
+@cache_result(ttl=tagged_ttl(3600), tags=(PROGRAMS_CACHE_TAG,), stale_ttl=300)
+@read_only(cached=True)
+def search_programs_endpoint():
+    try:
+        q = request.args.get('q', '').strip()
+        if not q:
+            return jsonify({"error": "q is required"}), 400
+        if len(q) > 100:
+            return jsonify({"error": "q must be at most 100 characters"}), 400
+        
+        try:
+            filters = parse_program_filters(request.args)
+        except ValueError as e:
+            return jsonify({"error": str(e)}), 400
+        try:
+            limit = min(max(int(request.args.get('limit', DEFAULT_SEARCH_RESULTS)), 1), MAX_SEARCH_RESULTS)
+        except ValueError:
+            return jsonify({"error": "limit must be an integer"}), 400
+        
+        return jsonify({"query": q, "results": search_programs(q, limit, filters)}), 200
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+
+DEFAULT_NEARBY_RADIUS_MILES = 10
+MAX_NEARBY_RADIUS_MILES = 100
+
+@app.route("/api/programs/nearby", methods=["GET"])
+@rate_limit('catalog')
+@cache_result(ttl=tagged_ttl(3600), tags=(PROGRAMS_CACHE_TAG,), stale_ttl=300)
+@read_only(cached=True)
+def get_nearby_programs():
+    try:
+        zip_code = request.args.get('zip', '').strip()
+        if not zip_code:
+            return jsonify({"error": "zip is required"}), 400
+        origin = zip_centroids.lookup_zip(zip_code)
+        if not origin:
+            return jsonify({"error": f"Unknown zip code: {zip_code}"}), 404
+        
+        try:
+            radius = float(request.args.get('radius', DEFAULT_NEARBY_RADIUS_MILES))
+            limit = min(max(int(request.args.get('limit', DEFAULT_PAGE_SIZE)), 1), MAX_PAGE_SIZE)
+        except ValueError:
+            return jsonify({"error": "radius and limit must be numbers"}), 400
+        if not 0 < radius <= MAX_NEARBY_RADIUS_MILES:
+            return jsonify({"error": f"radius must be between 0 and {MAX_NEARBY_RADIUS_MILES} miles"}), 400
+        
+        # The grid index narrows the search to the circle's bounding box;
+        # exact distances are only computed for those candidates
+        lat, lon = origin
+        cells = or_(*[Program.geo_cell.between(first, last) for first, last in grid_cell_ranges(lat, lon, radius)])
+        candidates = db.session.query(*PROGRAM_LIST_COLUMNS, Program.latitude, Program.longitude) \
+            .filter(Program.is_active.is_(True), cells) \
+            .all()
+        
+        results = []
+        for row in candidates:
+            distance = haversine_miles(lat, lon, row.latitude, row.longitude)
+            if distance <= radius:
+                results.append((distance, row))
+        results.sort(key=lambda result: (result[0], result[1].id))
+        
+        programs = []
+        for distance, row in results[:limit]:
+            program = serialize_program(row)
+            program['distance_miles'] = round(distance, 2)
+            programs.append(program)
+        
+        return jsonify({
+            "origin": {"zip": zip_code, "latitude": lat, "longitude": lon},
+            "radius_miles": radius,
+            "results": programs
+        }), 200
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+
+FACET_FILTERS = ('sport_type', 'organization', 'price_bucket', 'age_band')
+
+@app.route("/api/programs/facets", methods=["GET"])
+@rate_limit('catalog')
+@cache_result(ttl=tagged_ttl(3600), tags=(PROGRAMS_CACHE_TAG,), stale_ttl=300)
+@read_only(cached=True)
+def get_program_facets():
+    try:
+        filters = {name: request.args[name] for name in FACET_FILTERS if request.args.get(name)}
+        band_bits = {label: 1 << i for i, (label, _, _) in enumerate(AGE_BANDS)}
+        if 'age_band' in filters and filters['age_band'] not in band_bits:
+            return jsonify({"error": f"age_band must be one of {', '.join(band_bits)}"}), 400
+        
+        def matches(row, skip=None):
+            for name, value in filters.items():
+                if name == skip:
+                    continue
+                if name == 'age_band':
+                    if not row.age_mask & band_bits[value]:
+                        return False
+                elif getattr(row, name) != value:
+                    return False
+            return True
+        
+        # The aggregate has one row per distinct facet combination, so this
+        # reads a few hundred rows no matter how large the catalog is. Each
+        # facet is counted with every filter applied except its own.
+        facets = {name: {} for name in FACET_FILTERS}
+        total = 0
+        for row in ProgramFacetCount.query.filter(ProgramFacetCount.count > 0).all():
+            if matches(row):
+                total += row.count
+            for name in ('sport_type', 'organization', 'price_bucket'):
+                value = getattr(row, name)
+                if value and matches(row, skip=name):
+                    facets[name][value] = facets[name].get(value, 0) + row.count
+            if matches(row, skip='age_band'):
+                for label, bit in band_bits.items():
+                    if row.age_mask & bit:
+                        facets['age_band'][label] = facets['age_band'].get(label, 0) + row.count
+        
+        return jsonify({"total": total, "facets": facets}), 200
     except Exception as e:
         return jsonify({"error": str(e)}), 500
 
@@ -250,13 +853,16 @@ def create_program():
             age_range=data.get('age_range'),
             price=data.get('price'),
             location=data.get('location'),
+            zip_code=data.get('zip_code'),
             description=data.get('description'),
             sport_type=data.get('sport_type'),
             organization=data.get('organization')
         )
         
         db.session.add(program)
+        record_program_facets(program)
         db.session.commit()
+        invalidate_tag(PROGRAMS_CACHE_TAG)
         
         return jsonify({
             "message": "Program created successfully",
@@ -278,7 +884,7 @@ def create_program():
 def create_family():
     try:
         data = request.get_json()
-        user_id = get_jwt_identity()
+        user_id = int(get_jwt_identity())
         
         family = Family(
             user_id=user_id,
@@ -291,6 +897,7 @@ def create_family():
         
         db.session.add(family)
         db.session.commit()
+        invalidate_tag(FAMILIES_CACHE_TAG)
         
         return jsonify({
             "message": "Family registered successfully",
@@ -309,9 +916,11 @@ def create_family():
 
 @app.route("/api/family", methods=["GET"])
 @jwt_required()
+@cache_result(ttl=tagged_ttl(300), tags=(FAMILIES_CACHE_TAG,), vary_on_identity=True)
+@read_only
 def get_families():
     try:
-        user_id = get_jwt_identity()
+        user_id = int(get_jwt_identity())
         families = Family.query.filter_by(user_id=user_id).all()
         
         return jsonify([{
@@ -327,45 +936,33 @@ def get_families():
     except Exception as e:
         return jsonify({"error": str(e)}), 500
 
-# Sports API Integration endpoints
+# Sports API Integration endpoints; one integration per process so upstream connections are reused
+sports_api = SportsAPIIntegration()
+
 @app.route("/api/sports/sync", methods=["POST"])
+@rate_limit('sync')
 @jwt_required()
 def sync_sports_programs():
     try:
-        sports_api = SportsAPIIntegration()
-        
         # For development, use mock data
-        # In production, uncomment the line below to sync from real APIs
-        # all_programs = sports_api.sync_all_organizations()
-        all_programs = {"mock": get_mock_sports_data()}
-        
-        # Store programs in database
-        programs_added = 0
-        for org_name, programs in all_programs.items():
-            for program_data in programs:
-                # Check if program already exists
-                existing = Program.query.filter_by(
-                    name=program_data['name'],
-                    organization=program_data['organization']
-                ).first()
-                
-                if not existing:
-                    program = Program(
-                        name=program_data['name'],
-                        age_range=program_data.get('age_range'),
-                        price=program_data.get('price'),
-                        location=program_data.get('location'),
-                        description=program_data.get('description'),
-                        sport_type=program_data.get('sport_type'),
-                        organization=program_data.get('organization')
-                    )
-                    db.session.add(program)
-                    programs_added += 1
+        # In production, uncomment the lines below to sync from real APIs, resuming from the saved states
+        # states = {state.organization: state.to_dict() for state in SyncState.query.all()}
+        # sync = sports_api.sync_all_organizations(states=states)
+        sync = {'programs': {"mock": get_mock_sports_data()}, 'states': {}}
+        all_programs = sync['programs']
         
+        # Store changed programs and the new sync positions in one transaction
+        programs_added, programs_updated = upsert_programs(
+            [program for programs in all_programs.values() for program in programs]
+        )
+        save_sync_states(sync['states'])
         db.session.commit()
+        if programs_added or programs_updated:
+            invalidate_tag(PROGRAMS_CACHE_TAG)
         
         return jsonify({
             "message": f"Successfully synced {programs_added} new programs",
+            "updated_programs": programs_updated,
             "organizations": list(all_programs.keys()),
             "total_programs": sum(len(programs) for programs in all_programs.values())
         }), 200
@@ -373,10 +970,93 @@ def sync_sports_programs():
     except Exception as e:
         return jsonify({"error": str(e)}), 500
 
+# Program columns a sync may set, by key in the normalized program data
+SYNCED_PROGRAM_FIELDS = ('name', 'age_range', 'price', 'location', 'zip_code', 'description', 'sport_type',
+                         'organization', 'registration_url')
+
+def _synced_value(field, value):
+    if field == 'price' and value is not None:
+        return Decimal(str(value)).quantize(Decimal('0.01'))
+    return value
+
+def upsert_programs(programs):
+    """
+    Insert new synced programs and update changed ones, matched on external_id
+    Programs stored before external_ids were kept are matched on name and
+    organization instead, and get their external_id filled in. Unchanged
+    programs are not written. Returns (added, updated)
+    """
+    external_ids = [p['external_id'] for p in programs if p.get('external_id')]
+    existing = {}
+    for chunk_start in range(0, len(external_ids), 1000):
+        chunk = external_ids[chunk_start:chunk_start + 1000]
+        existing.update((program.external_id, program)
+                        for program in Program.query.filter(Program.external_id.in_(chunk)))
+    
+    # Programs without an external_id, by (name, organization)
+    legacy = {}
+    organizations = list({p.get('organization') for p in programs if p.get('external_id') not in existing})
+    for chunk_start in range(0, len(organizations), 1000):
+        chunk = organizations[chunk_start:chunk_start + 1000]
+        for program in Program.query.filter(Program.external_id.is_(None), Program.organization.in_(chunk)):
+            legacy.setdefault((program.name, program.organization), program)
+    
+    added = updated = 0
+    for program_data in programs:
+        values = {field: _synced_value(field, program_data.get(field)) for field in SYNCED_PROGRAM_FIELDS}
+        external_id = program_data.get('external_id')
+        key = (values['name'], values['organization'])
+        program = existing.get(external_id) if external_id else legacy.get(key)
+        backfilled = False
+        if program is None and external_id:
+            program = legacy.pop(key, None)
+            if program is not None:
+                program.external_id = external_id
+                existing[external_id] = program
+                backfilled = True
+        
+        if program is None:
+            program = Program(external_id=external_id, **values)
+            db.session.add(program)
+            record_program_facets(program)
+            if external_id:
+                existing[external_id] = program
+            else:
+                legacy[key] = program
+            added += 1
+            continue
+        
+        changed = {field: value for field, value in values.items() if getattr(program, field) != value}
+        if changed:
+            record_program_facets(program, delta=-1)
+            for field, value in changed.items():
+                setattr(program, field, value)
+            if 'zip_code' in changed or 'location' in changed:
+                program.geocode()
+            record_program_facets(program)
+        if changed or backfilled:
+            updated += 1
+    
+    return added, updated
+
+def save_sync_states(states):
+    """Record where each organization's sync left off, in the caller's transaction"""
+    if not states:
+        return
+    existing = {state.organization: state for state in SyncState.query.filter(SyncState.organization.in_(states))}
+    for organization, values in states.items():
+        state = existing.get(organization)
+        if state is None:
+            state = SyncState(organization=organization)
+            db.session.add(state)
+        state.etag = values.get('etag')
+        state.last_modified = values.get('last_modified')
+        state.cursor = values.get('cursor')
+        state.synced_at = datetime.utcnow()
+
 @app.route("/api/sports/organizations", methods=["GET"])
 def get_sports_organizations():
     try:
-        sports_api = SportsAPIIntegration()
         organizations = list(sports_api.api_configs.keys())
         return jsonify({"organizations": organizations}), 200
     except Exception as e:
@@ -385,7 +1065,6 @@ def get_sports_organizations():
 @app.route("/api/sports/programs/<org_name>", methods=["GET"])
 def get_organization_programs(org_name):
     try:
-        sports_api = SportsAPIIntegration()
         programs = sports_api.fetch_programs_from_organization(org_name)
         return jsonify({"programs": programs}), 200
     except Exception as e:
@@ -394,7 +1073,6 @@ def get_organization_programs(org_name):
 @app.route("/api/sports/programs/<org_name>/<program_id>/availability", methods=["GET"])
 def check_program_availability(org_name, program_id):
     try:
-        sports_api = SportsAPIIntegration()
         availability = sports_api.check_availability(org_name, program_id)
         return jsonify(availability), 200
     except Exception as e:
@@ -402,7 +1080,6 @@ def check_program_availability(org_name, program_id):
 
 # Health check endpoint
 @app.route("/api/health", methods=["GET"])
-@monitor_performance
 def health_check():
     return jsonify({"status": "healthy", "timestamp": datetime.utcnow().isoformat()}), 200
 
@@ -412,16 +1089,55 @@ def health_check():
 def performance_report():
     try:
         report = get_performance_report()
+        report['replica'] = replica_router.get_stats()
+        report['upstream'] = upstream_client.get_stats()
         return jsonify(report), 200
     except Exception as e:
         return jsonify({"error": str(e)}), 500
 
+# On-demand sampling profile of the requests handled by this worker
+MAX_PROFILE_SECONDS = 60
+MAX_PROFILE_HZ = 1000
+
+@app.route("/api/profile", methods=["GET"])
+@jwt_required()
+def sampling_profile():
+    try:
+        try:
+            seconds = float(request.args.get('seconds', 10))
+            hz = int(request.args.get('hz', 100))
+        except ValueError:
+            return jsonify({"error": "seconds and hz must be numbers"}), 400
+        if not 0 < seconds <= MAX_PROFILE_SECONDS or not 0 < hz <= MAX_PROFILE_HZ:
+            return jsonify({"error": f"seconds must be in (0, {MAX_PROFILE_SECONDS}] and hz in (0, {MAX_PROFILE_HZ}]"}), 400
+        
+        output = request.args.get('format', 'collapsed')
+        if output not in ('collapsed', 'speedscope'):
+            return jsonify({"error": "format must be collapsed or speedscope"}), 400
+        
+        try:
+            profile = sampling_profiler.profile(seconds, hz)
+        except RuntimeError as e:
+            return jsonify({"error": str(e)}), 409
+        
+        headers = {'X-Profile-Overhead': f"{profile.overhead:.4f}"}
+        if output == 'speedscope':
+            return jsonify(profile.to_speedscope()), 200, headers
+        return Response(profile.to_collapsed(), mimetype='text/plain', headers=headers)
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+
+# OpenMetrics endpoint for Prometheus-compatible scrapers
+@app.route("/metrics", methods=["GET"])
+def metrics():
+    return Response(render_metrics(), content_type=OPENMETRICS_CONTENT_TYPE)
+
 # Initialize database
 with app.app_context():
     db.create_all()
     
     # Seed initial programs if database is empty
-    if Program.query.count() == 0:
+    if db.session.query(Program.id).first() is None:
         programs_data = read_json("programs.json")
         for program_data in programs_data:
             program = Program(
@@ -431,6 +1147,7 @@ with app.app_context():
                 location=program_data['location']
             )
             db.session.add(program)
+            record_program_facets(program)
         db.session.commit()
 
 if __name__ == "__main__":
@@ -0,0 +1,278 @@
+"""
+Heartbeat log for real uptime and SLO burn-rate tracking
+Every worker appends a fixed-size record per heartbeat interval to a shared
+append-only file: the tick time plus the requests, errors and slow requests it
+handled since its previous tick. Periods with no ticks from any worker
+(restarts, crashes, hangs) count as downtime.
+"""
+
+import math
+import os
+import struct
+import tempfile
+import threading
+import time
+import logging
+
+logger = logging.getLogger(__name__)
+
+# timestamp (unix seconds), requests, errors, slow requests
+RECORD = struct.Struct('<dIII')
+
+HEARTBEAT_FILE = os.path.join(tempfile.gettempdir(), 'sportsid-heartbeat.bin')
+
+AVAILABILITY_WINDOWS = (('1h', 3600), ('24h', 86400), ('30d', 30 * 86400))
+
+# (name, long window, short window, burn-rate threshold): both windows must
+# burn faster than the threshold, as in the multi-window alerts of the SRE workbook
+BURN_RATE_ALERTS = (
+    ('page', 3600, 300, 14.4),
+    ('ticket', 6 * 3600, 1800, 6.0)
+)
+
+# Seconds between attempts to drop records older than the retention period
+COMPACT_INTERVAL = 3600
+
+class MinuteTotals:
+    """Heartbeat records folded into one minute: seconds covered by a tick, and outcome totals"""
+    __slots__ = ('covered', 'requests', 'errors', 'slow')
+
+    def __init__(self):
+        self.covered = 0  # bit i set: second i of the minute was covered by some tick
+        self.requests = 0
+        self.errors = 0
+        self.slow = 0
+
+def _cover(minutes, start, end):
+    """Mark the whole seconds in [start, end) as covered"""
+    second, end = math.ceil(start), math.ceil(end)
+    while second < end:
+        minute, offset = divmod(second, 60)
+        upto = min(end - minute * 60, 60)
+        totals = minutes.get(minute)
+        if totals is None:
+            totals = minutes[minute] = MinuteTotals()
+        totals.covered |= ((1 << upto) - 1) ^ ((1 << offset) - 1)
+        second = minute * 60 + upto
+
+class HeartbeatRecorder:
+    """
+    Appends heartbeat records and computes availability and burn rates from them
+    New records are folded into per-minute totals as they are appended, so a
+    report reads only the bytes written since the previous one
+    """
+
+    def __init__(self, path=HEARTBEAT_FILE, interval=10.0, retention=31 * 86400):
+        self.path = path
+        self.interval = interval
+        self.retention = retention
+        self.requests = 0
+        self.errors = 0
+        self.slow = 0
+        self.minutes = {}  # minute number -> MinuteTotals
+        self.first = None
+        self.file_id = None
+        self.offset = 0
+        self.thread = None
+        self.stopped = threading.Event()
+        self.lock = threading.Lock()
+        self.totals_lock = threading.Lock()
+
+    def record_outcome(self, error, slow):
+        """Count one finished request towards the next heartbeat"""
+        with self.lock:
+            self.requests += 1
+            if error:
+                self.errors += 1
+            if slow:
+                self.slow += 1
+
+    def _take_counts(self):
+        with self.lock:
+            counts = (self.requests, self.errors, self.slow)
+            self.requests = self.errors = self.slow = 0
+        return counts
+
+    def append(self, timestamp, requests=0, errors=0, slow=0):
+        """Append one record; a single small O_APPEND write, so workers never interleave"""
+        with open(self.path, 'ab') as f:
+            f.write(RECORD.pack(timestamp, requests, errors, slow))
+
+    def tick(self):
+        self.append(time.time(), *self._take_counts())
+
+    def _run(self):
+        self.refresh()
+        compacted_at = time.monotonic()
+        while not self.stopped.wait(self.interval):
+            try:
+                self.tick()
+                if time.monotonic() - compacted_at >= COMPACT_INTERVAL:
+                    compacted_at = time.monotonic()
+                    self.compact()
+                # Fold in every worker's records here rather than in the next report
+                self.refresh()
+            except Exception as e:
+                logger.error(f"Error writing heartbeat: {e}")
+
+    def start(self):
+        """Compact the log and start ticking once per process"""
+        with self.lock:
+            if self.thread is not None and self.thread.is_alive():
+                return
+            try:
+                self.compact()
+                self.append(time.time())
+            except Exception as e:
+                logger.error(f"Error starting heartbeat log {self.path}: {e}")
+            self.stopped.clear()
+            self.thread = threading.Thread(target=self._run, name='heartbeat', daemon=True)
+            self.thread.start()
+
+    def stop(self):
+        self.stopped.set()
+
+    def read(self, since=0):
+        """Records with a timestamp at or after since, oldest first"""
+        try:
+            with open(self.path, 'rb') as f:
+                data = f.read()
+        except FileNotFoundError:
+            return []
+        # Ignore a torn trailing record from a worker killed mid-write
+        data = data[:len(data) - len(data) % RECORD.size]
+        return sorted(record for record in RECORD.iter_unpack(data) if record[0] >= since)
+
+    def compact(self, now=None):
+        """Drop records older than the retention period"""
+        now = time.time() if now is None else now
+        try:
+            with open(self.path, 'rb') as f:
+                head = f.read(RECORD.size)
+        except FileNotFoundError:
+            return
+        # Records are appended in time order, so the first one is the oldest
+        if len(head) < RECORD.size or RECORD.unpack(head)[0] >= now - self.retention:
+            return
+
+        records = self.read()
+
+        kept = [record for record in records if record[0] >= now - self.retention]
+        tmp_path = f"{self.path}.{os.getpid()}.tmp"
+        with open(tmp_path, 'wb') as f:
+            f.write(b''.join(RECORD.pack(*record) for record in kept))
+        os.replace(tmp_path, self.path)
+
+    def refresh(self):
+        """Fold records appended since the last call into the per-minute totals"""
+        with self.totals_lock:
+            try:
+                with open(self.path, 'rb') as f:
+                    stat = os.fstat(f.fileno())
+                    file_id = (stat.st_dev, stat.st_ino)
+                    if file_id != self.file_id or stat.st_size < self.offset:
+                        # Replaced by a compaction: start over from the new file
+                        self.minutes, self.first, self.file_id, self.offset = {}, None, file_id, 0
+                    f.seek(self.offset)
+                    data = f.read()
+            except FileNotFoundError:
+                return
+            # Leave a partially written trailing record for the next call
+            data = data[:len(data) - len(data) % RECORD.size]
+            self.offset += len(data)
+
+            minutes = self.minutes
+            reach = self.interval * 1.5
+            for timestamp, requests, errors, slow in RECORD.iter_unpack(data):
+                if self.first is None or timestamp < self.first:
+                    self.first = timestamp
+                # Each tick proves liveness for the interval before it; allow for jitter
+                _cover(minutes, timestamp - reach, timestamp)
+                if requests:
+                    minute = math.floor(timestamp / 60)
+                    totals = minutes.get(minute)
+                    if totals is None:
+                        totals = minutes[minute] = MinuteTotals()
+                    totals.requests += requests
+                    totals.errors += errors
+                    totals.slow += slow
+
+            if data and minutes:
+                # Relative to the newest record, as compact() is relative to now
+                oldest = math.floor((RECORD.unpack_from(data, len(data) - RECORD.size)[0] - self.retention) / 60)
+                if min(minutes) < oldest:
+                    for minute in [m for m in minutes if m < oldest]:
+                        del minutes[minute]
+
+    def _window(self, start, end, live):
+        """Uptime fraction and outcome totals for [start, end], to minute resolution for the totals"""
+        up = requests = errors = slow = 0
+        first_second, end_second = math.floor(start), math.floor(end)
+        for minute in range(first_second // 60, end_second // 60 + 1):
+            totals = self.minutes.get(minute)
+            live_totals = live.get(minute)
+            if totals is None and live_totals is None:
+                continue
+            covered = (totals.covered if totals else 0) | (live_totals.covered if live_totals else 0)
+            low = max(first_second - minute * 60, 0)
+            high = min(end_second - minute * 60, 60)
+            if high > low:
+                up += (covered & (((1 << high) - 1) ^ ((1 << low) - 1))).bit_count()
+            for part in (totals, live_totals):
+                if part is not None:
+                    requests += part.requests
+                    errors += part.errors
+                    slow += part.slow
+
+        length = end - start
+        return {
+            'uptime': min(up / length, 1.0) if length > 0 else 1.0,
+            'requests': requests,
+            'errors': errors,
+            'slow': slow,
+            'error_rate': errors / requests if requests else 0,
+            'slow_rate': slow / requests if requests else 0
+        }
+
+    def report(self, budgets, now=None):
+        """
+        Availability per window and error-budget burn rates; budgets gives the
+        allowed fraction of 'errors', 'latency' (slow requests) and 'uptime' (downtime)
+        Windows start no earlier than the first record, so a fresh install
+        is not charged for the time before tracking began
+        """
+        now = time.time() if now is None else now
+        self.refresh()
+        # This process is alive right now and its pending counts are not yet written
+        live = {}
+        _cover(live, now - self.interval * 1.5, now)
+        pending = live.setdefault(math.floor(now / 60), MinuteTotals())
+        with self.lock:
+            pending.requests, pending.errors, pending.slow = self.requests, self.errors, self.slow
+
+        with self.totals_lock:
+            first = min(self.first if self.first is not None else now, now) - self.interval
+
+            def window(seconds):
+                return self._window(max(now - seconds, first), now, live)
+
+            availability = {name: window(seconds) for name, seconds in AVAILABILITY_WINDOWS}
+
+            burn_rates = {}
+            alerts = []
+            for name, long_window, short_window, threshold in BURN_RATE_ALERTS:
+                rates = {}
+                for seconds in (long_window, short_window):
+                    stats = window(seconds)
+                    rates[f"{seconds // 60}m"] = {
+                        'errors': stats['error_rate'] / budgets['errors'],
+                        'latency': stats['slow_rate'] / budgets['latency'],
+                        'uptime': (1 - stats['uptime']) / budgets['uptime']
+                    }
+                burn_rates.update(rates)
+                for slo in budgets:
+                    if all(rate[slo] > threshold for rate in rates.values()):
+                        alerts.append(f"{name}: {slo} error budget burning over {threshold}x "
+                                      f"in the last {long_window // 60}m and {short_window // 60}m")
+
+        return {'availability': availability, 'burn_rates': burn_rates, 'alerts': alerts}
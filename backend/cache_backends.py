@@ -0,0 +1,711 @@
+"""
+Storage backends for CacheManager
+- MemoryCacheBackend: per-process LRU dict (default)
+- SharedMemoryCacheBackend: files on /dev/shm shared by every worker on a host
+- RedisCacheBackend: any Redis-protocol server shared by every host
+"""
+
+import base64
+import fcntl
+import hashlib
+import json
+import os
+import socket
+import stat
+import struct
+import sys
+import tempfile
+import threading
+import time
+from collections import OrderedDict
+from datetime import date, datetime
+from decimal import Decimal
+from urllib.parse import urlparse
+
+from flask import Response
+
+def estimate_size(value):
+    """Approximate memory footprint of a cached value in bytes"""
+    if isinstance(value, Response):
+        return sys.getsizeof(value) + len(value.get_data())
+    if isinstance(value, (tuple, list)):
+        return sys.getsizeof(value) + sum(estimate_size(item) for item in value)
+    if isinstance(value, dict):
+        return sys.getsizeof(value) + sum(estimate_size(k) + estimate_size(v) for k, v in value.items())
+    return sys.getsizeof(value)
+
+# Named tuple classes shared backends may rebuild, by name; see register_cache_type
+CACHE_TYPES = {}
+
+def register_cache_type(cls):
+    """Allow instances of a named tuple class to be stored in shared backends"""
+    CACHE_TYPES[cls.__name__] = cls
+    return cls
+
+def _to_json(value):
+    """Tagged JSON-ready form of value; tags start with "~" so plain dicts stay readable"""
+    if value is None or isinstance(value, (bool, int, float, str)):
+        return value
+    if isinstance(value, bytes):
+        return {'~b': base64.b64encode(value).decode('ascii')}
+    if isinstance(value, list):
+        return [_to_json(item) for item in value]
+    if isinstance(value, tuple):
+        if CACHE_TYPES.get(type(value).__name__) is type(value):
+            return {'~nt': [type(value).__name__, [_to_json(item) for item in value]]}
+        return {'~t': [_to_json(item) for item in value]}
+    if isinstance(value, dict):
+        if all(isinstance(k, str) and not k.startswith('~') for k in value):
+            return {k: _to_json(v) for k, v in value.items()}
+        return {'~d': [[_to_json(k), _to_json(v)] for k, v in value.items()]}
+    if isinstance(value, datetime):
+        return {'~dt': value.isoformat()}
+    if isinstance(value, date):
+        return {'~date': value.isoformat()}
+    if isinstance(value, Decimal):
+        return {'~dec': str(value)}
+    raise TypeError(f"Cannot store {type(value).__name__} in a shared cache")
+
+def _from_json(obj):
+    if len(obj) != 1:
+        return obj
+    (tag, data), = obj.items()
+    if tag == '~b':
+        return base64.b64decode(data)
+    if tag == '~t':
+        return tuple(data)
+    if tag == '~nt':
+        name, fields = data
+        if name not in CACHE_TYPES:
+            raise ValueError(f"Unregistered cache type: {name}")
+        return CACHE_TYPES[name](*fields)
+    if tag == '~d':
+        return {k: v for k, v in data}
+    if tag == '~dt':
+        return datetime.fromisoformat(data)
+    if tag == '~date':
+        return date.fromisoformat(data)
+    if tag == '~dec':
+        return Decimal(data)
+    return obj
+
+def dumps_value(value):
+    """
+    Serialize a cached value for a shared backend
+    JSON rather than pickle, so whoever can write the store cannot run code
+    in the app by planting an entry
+    """
+    return json.dumps(_to_json(value), separators=(',', ':')).encode()
+
+def loads_value(data):
+    return json.loads(data, object_hook=_from_json)
+
+def private_directory(path):
+    """Create path readable only by this user, refusing one someone else could have planted"""
+    os.makedirs(path, mode=0o700, exist_ok=True)
+    info = os.lstat(path)
+    if not stat.S_ISDIR(info.st_mode) or info.st_uid != os.getuid() or info.st_mode & 0o077:
+        raise PermissionError(f"Cache directory {path} must be a directory owned by uid {os.getuid()} "
+                              f"with mode 0700 (found uid {info.st_uid}, mode {stat.S_IMODE(info.st_mode):o})")
+
+class MemoryCacheBackend:
+    """
+    In-process LRU store with per-entry TTL, bounded by entry count and bytes
+    Reads and writes are O(1); expired entries are also swept periodically so
+    they do not hold memory until someone happens to read them
+    """
+
+    name = 'memory'
+
+    def __init__(self, max_size=1000, max_bytes=64 * 1024 * 1024, sweep_interval=60):
+        self.cache = OrderedDict()  # key -> (value, expires_at, size), least recently used first
+        self.counters = {}  # Never evicted: losing a tag version would resurrect stale entries
+        self.expiring_counters = {}  # key -> (value, expires_at), e.g. rate-limit windows
+        self.max_size = max_size
+        self.max_bytes = max_bytes
+        self.sweep_interval = sweep_interval
+        self.current_bytes = 0
+        self.last_sweep = time.time()
+        self.evictions = 0
+        self.expirations = 0
+        self.lock = threading.Lock()
+
+    def _remove(self, key):
+        _, _, size = self.cache.pop(key)
+        self.current_bytes -= size
+
+    def _sweep(self, now):
+        """Drop expired entries; O(n), so only run once per sweep_interval"""
+        expired = [key for key, (_, expires_at, _) in self.cache.items() if expires_at <= now]
+        for key in expired:
+            self._remove(key)
+        self.expirations += len(expired)
+        for key in [key for key, (_, expires_at) in self.expiring_counters.items() if expires_at <= now]:
+            del self.expiring_counters[key]
+        self.last_sweep = now
+
+    def get(self, key):
+        with self.lock:
+            entry = self.cache.get(key)
+            if entry is None:
+                return None
+
+            value, expires_at, _ = entry
+            if time.time() >= expires_at:
+                self._remove(key)
+                self.expirations += 1
+                return None
+
+            self.cache.move_to_end(key)
+            return value
+
+    def set(self, key, value, ttl):
+        size = estimate_size(value)
+        if size > self.max_bytes:
+            return
+
+        now = time.time()
+        with self.lock:
+            if key in self.cache:
+                self._remove(key)
+            self.cache[key] = (value, now + ttl, size)
+            self.current_bytes += size
+
+            if now - self.last_sweep >= self.sweep_interval:
+                self._sweep(now)
+
+            # Evict least recently used entries until back within bounds
+            while len(self.cache) > self.max_size or self.current_bytes > self.max_bytes:
+                self._remove(next(iter(self.cache)))
+                self.evictions += 1
+
+    def delete(self, key):
+        with self.lock:
+            if key in self.cache:
+                self._remove(key)
+
+    def get_counter(self, key):
+        with self.lock:
+            if key in self.expiring_counters:
+                value, expires_at = self.expiring_counters[key]
+                return value if expires_at > time.time() else 0
+            return self.counters.get(key, 0)
+
+    def incr(self, key, ttl=None, amount=1):
+        """Add amount to a counter; with a ttl it starts over ttl seconds after it was created"""
+        with self.lock:
+            if ttl is None:
+                self.counters[key] = self.counters.get(key, 0) + amount
+                return self.counters[key]
+
+            now = time.time()
+            value, expires_at = self.expiring_counters.get(key, (0, 0))
+            if expires_at <= now:
+                value, expires_at = 0, now + ttl
+            self.expiring_counters[key] = (value + amount, expires_at)
+            if now - self.last_sweep >= self.sweep_interval:
+                self._sweep(now)
+            return value + amount
+
+    def sweep(self):
+        with self.lock:
+            self._sweep(time.time())
+
+    def clear(self):
+        with self.lock:
+            self.cache.clear()
+            self.current_bytes = 0
+
+    def get_stats(self):
+        with self.lock:
+            return {
+                'evictions': self.evictions,
+                'expirations': self.expirations,
+                'entries': len(self.cache),
+                'bytes': self.current_bytes,
+                'max_entries': self.max_size,
+                'max_bytes': self.max_bytes
+            }
+
+class SharedMemoryCacheBackend:
+    """
+    Host-wide store: one file per entry under a tmpfs directory (/dev/shm),
+    so every worker process on the host reads and writes the same cache
+    Writes are atomic renames; counters are updated under an flock. The
+    directory must be private to the app's user, and entry count and size are
+    kept in a shared stats file so get_stats never scans the entries.
+    Expiring counters (rate-limit windows) live in a fixed-size table of
+    slots instead of files: each key hashes to a group of COUNTER_WAYS slots,
+    expired slots are reused in place, and a full group overwrites its
+    soonest-expiring slot, so memory stays flat however many clients appear
+    """
+
+    name = 'shared_memory'
+    HEADER = struct.Struct('<d')  # expires_at, followed by the serialized value
+    COUNTER_SLOT = struct.Struct('<16sqd')  # key digest, value, expires_at
+    COUNTER_WAYS = 16
+
+    def __init__(self, path=None, max_bytes=256 * 1024 * 1024, sweep_interval=60, counter_slots=65536):
+        if path is None:
+            base = '/dev/shm' if os.path.isdir('/dev/shm') else tempfile.gettempdir()
+            path = os.path.join(base, f'sportsid-cache-{os.getuid()}')
+        self.path = path
+        self.entries_path = os.path.join(path, 'entries')
+        self.counters_path = os.path.join(path, 'counters')
+        self.stats_path = os.path.join(path, 'stats')
+        self.sweep_lock_path = os.path.join(path, 'sweep.lock')
+        for directory in (path, self.entries_path, self.counters_path):
+            private_directory(directory)
+        self.max_bytes = max_bytes
+        self.sweep_interval = sweep_interval
+        self.last_sweep = time.time()
+        self.evictions = 0
+        self.expirations = 0
+        self.lock = threading.Lock()
+
+        self.group_bytes = self.COUNTER_WAYS * self.COUNTER_SLOT.size
+        self.table_fd = os.open(os.path.join(path, 'counters.table'), os.O_RDWR | os.O_CREAT, 0o600)
+        # Workers sharing the table must agree on its layout, so an existing table keeps its size
+        if os.fstat(self.table_fd).st_size == 0:
+            os.ftruncate(self.table_fd, max(counter_slots // self.COUNTER_WAYS, 1) * self.group_bytes)
+        self.counter_groups = os.fstat(self.table_fd).st_size // self.group_bytes
+        self.counter_evictions = 0
+        # POSIX record locks exclude other processes only; threads take this first
+        self.table_lock = threading.Lock()
+
+    def _file(self, directory, key):
+        return os.path.join(directory, hashlib.sha256(str(key).encode()).hexdigest())
+
+    def _write_atomic(self, filename, data):
+        fd, tmp = tempfile.mkstemp(dir=os.path.dirname(filename), prefix='.tmp')
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                f.write(data)
+            os.replace(tmp, filename)
+        except BaseException:
+            os.unlink(tmp)
+            raise
+
+    def get(self, key):
+        filename = self._file(self.entries_path, key)
+        try:
+            with open(filename, 'rb') as f:
+                data = f.read()
+        except FileNotFoundError:
+            return None
+
+        (expires_at,) = self.HEADER.unpack_from(data)
+        if time.time() >= expires_at:
+            self.delete(key)
+            self.expirations += 1
+            return None
+        return loads_value(data[self.HEADER.size:])
+
+    def set(self, key, value, ttl):
+        data = self.HEADER.pack(time.time() + ttl) + dumps_value(value)
+        if len(data) > self.max_bytes:
+            return
+        filename = self._file(self.entries_path, key)
+        try:
+            replaced = os.stat(filename).st_size
+        except FileNotFoundError:
+            replaced = None
+        self._write_atomic(filename, data)
+        _, total = self._adjust_stats(0 if replaced is not None else 1, len(data) - (replaced or 0))
+
+        if total > self.max_bytes:
+            self._make_room()
+        elif time.time() - self.last_sweep >= self.sweep_interval:
+            self.sweep()
+
+    def delete(self, key):
+        self._remove(self._file(self.entries_path, key))
+
+    def _update_stats(self, update):
+        """Apply update((entries, bytes)) -> (entries, bytes) to the stats file under an flock; returns the result"""
+        with open(self.stats_path, 'a+b') as f:
+            fcntl.flock(f, fcntl.LOCK_EX)
+            try:
+                f.seek(0)
+                fields = f.read().split()
+                entries, size = update((int(fields[0]), int(fields[1])) if len(fields) == 2 else (0, 0))
+                f.seek(0)
+                f.truncate()
+                f.write(f"{entries} {size}".encode())
+                f.flush()
+            finally:
+                fcntl.flock(f, fcntl.LOCK_UN)
+        return entries, size
+
+    def _adjust_stats(self, entries, size):
+        return self._update_stats(lambda totals: (totals[0] + entries, totals[1] + size))
+
+    def _read_stats(self):
+        try:
+            with open(self.stats_path, 'rb') as f:
+                fcntl.flock(f, fcntl.LOCK_SH)
+                fields = f.read().split()
+        except FileNotFoundError:
+            fields = []
+        return (int(fields[0]), int(fields[1])) if len(fields) == 2 else (0, 0)
+
+    def _remove(self, filename):
+        """Unlink an entry file and take it out of the totals; False if it was already gone"""
+        try:
+            size = os.stat(filename).st_size
+            os.unlink(filename)
+        except FileNotFoundError:
+            return False
+        self._adjust_stats(-1, -size)
+        return True
+
+    def _counter_group(self, key):
+        """(key digest, byte offset of the key's slot group) in the counter table"""
+        digest = hashlib.sha256(str(key).encode()).digest()
+        return digest[:16], int.from_bytes(digest[16:24], 'little') % self.counter_groups * self.group_bytes
+
+    def _read_group(self, offset, lock):
+        fcntl.lockf(self.table_fd, lock, self.group_bytes, offset)
+        group = os.pread(self.table_fd, self.group_bytes, offset)
+        return [self.COUNTER_SLOT.unpack_from(group, i * self.COUNTER_SLOT.size) for i in range(self.COUNTER_WAYS)]
+
+    def _get_expiring(self, key, now):
+        digest, offset = self._counter_group(key)
+        with self.table_lock:
+            try:
+                slots = self._read_group(offset, fcntl.LOCK_SH)
+            finally:
+                fcntl.lockf(self.table_fd, fcntl.LOCK_UN, self.group_bytes, offset)
+        for slot_digest, value, expires_at in slots:
+            if slot_digest == digest and expires_at > now:
+                return value
+        return None
+
+    def _incr_expiring(self, key, ttl, amount, now):
+        digest, offset = self._counter_group(key)
+        with self.table_lock:
+            try:
+                slots = self._read_group(offset, fcntl.LOCK_EX)
+                for index, (slot_digest, value, expires_at) in enumerate(slots):
+                    if slot_digest == digest and expires_at > now:
+                        value += amount
+                        break
+                else:
+                    # Empty and expired slots expire "soonest", so they are reused first
+                    index = min(range(self.COUNTER_WAYS), key=lambda i: slots[i][2])
+                    if slots[index][2] > now:
+                        self.counter_evictions += 1
+                    value, expires_at = amount, now + ttl
+                os.pwrite(self.table_fd, self.COUNTER_SLOT.pack(digest, value, expires_at),
+                          offset + index * self.COUNTER_SLOT.size)
+            finally:
+                fcntl.lockf(self.table_fd, fcntl.LOCK_UN, self.group_bytes, offset)
+        return value
+
+    def get_counter(self, key):
+        value = self._get_expiring(key, time.time())
+        if value is not None:
+            return value
+        try:
+            with open(self._file(self.counters_path, key), 'rb') as f:
+                return int(f.read() or 0)
+        except FileNotFoundError:
+            return 0
+
+    def incr(self, key, ttl=None, amount=1):
+        """Add amount to a counter; with a ttl it starts over ttl seconds after it was created"""
+        if ttl is not None:
+            return self._incr_expiring(key, ttl, amount, time.time())
+
+        # Counters without a ttl are tag versions: few, and never dropped
+        with open(self._file(self.counters_path, key), 'a+b') as f:
+            fcntl.flock(f, fcntl.LOCK_EX)
+            try:
+                f.seek(0)
+                value = int(f.read() or 0) + amount
+                f.seek(0)
+                f.truncate()
+                f.write(str(value).encode())
+                f.flush()
+            finally:
+                fcntl.flock(f, fcntl.LOCK_UN)
+        return value
+
+    def _scan(self):
+        """(filename, expires_at, size, mtime) for every entry on disk"""
+        entries = []
+        for entry in os.scandir(self.entries_path):
+            if entry.name.startswith('.tmp'):
+                continue
+            try:
+                with open(entry.path, 'rb') as f:
+                    (expires_at,) = self.HEADER.unpack(f.read(self.HEADER.size))
+                info = entry.stat()
+            except (FileNotFoundError, struct.error):
+                continue
+            entries.append((entry.path, expires_at, info.st_size, info.st_mtime))
+        return entries
+
+    def _make_room(self):
+        """
+        Evict on a write that took the total past max_bytes, down to 90% of it
+        so the O(n) pass is not repeated on every following write. Writers
+        over budget queue on the sweep lock, so tmpfs never holds much more
+        than max_bytes between sweeps
+        """
+        with open(self.sweep_lock_path, 'a+b') as lock:
+            fcntl.flock(lock, fcntl.LOCK_EX)
+            # Another worker may have made room while this one waited
+            if self._read_stats()[1] > self.max_bytes:
+                self._sweep(int(self.max_bytes * 0.9))
+
+    def sweep(self):
+        """Remove expired entries, then the oldest ones while over the byte budget"""
+        with open(self.sweep_lock_path, 'a+b') as lock:
+            fcntl.flock(lock, fcntl.LOCK_EX)
+            self._sweep(self.max_bytes)
+
+    def _sweep(self, budget):
+        """
+        Sweep with the sweep lock held, evicting the oldest entries down to budget bytes
+        The stats file is reset to the totals found, correcting any drift from
+        workers racing to replace the same entry
+        """
+        with self.lock:
+            now = time.time()
+            self.last_sweep = now
+            live = []
+            for filename, expires_at, size, mtime in self._scan():
+                if expires_at <= now:
+                    self._unlink(filename)
+                    self.expirations += 1
+                else:
+                    live.append((mtime, size, filename))
+
+            count, total = len(live), sum(size for _, size, _ in live)
+            for _, size, filename in sorted(live):
+                if total <= budget:
+                    break
+                self._unlink(filename)
+                count, total = count - 1, total - size
+                self.evictions += 1
+            self._update_stats(lambda totals: (count, total))
+
+    def _unlink(self, filename):
+        try:
+            os.unlink(filename)
+        except FileNotFoundError:
+            pass
+
+    def clear(self):
+        for entry in os.scandir(self.entries_path):
+            self._unlink(entry.path)
+        self._update_stats(lambda totals: (0, 0))
+
+    def get_stats(self):
+        entries, size = self._read_stats()
+        return {
+            'evictions': self.evictions,
+            'expirations': self.expirations,
+            'entries': max(entries, 0),
+            'bytes': max(size, 0),
+            'max_bytes': self.max_bytes,
+            'counter_slots': self.counter_groups * self.COUNTER_WAYS,
+            'counter_evictions': self.counter_evictions,
+            'path': self.path
+        }
+
+class RedisError(Exception):
+    """Error reply from a Redis-protocol server"""
+
+class RedisClient:
+    """Minimal thread-safe RESP2 client with a small connection pool"""
+
+    def __init__(self, host='localhost', port=6379, db=0, password=None, timeout=1.0, max_idle=8):
+        self.host = host
+        self.port = port
+        self.db = db
+        self.password = password
+        self.timeout = timeout
+        self.max_idle = max_idle
+        self.idle = []
+        self.lock = threading.Lock()
+
+    @classmethod
+    def from_url(cls, url, **kwargs):
+        parsed = urlparse(url)
+        return cls(
+            host=parsed.hostname or 'localhost',
+            port=parsed.port or 6379,
+            db=int(parsed.path.lstrip('/') or 0),
+            password=parsed.password,
+            **kwargs
+        )
+
+    def _connect(self):
+        sock = socket.create_connection((self.host, self.port), timeout=self.timeout)
+        sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        conn = (sock, sock.makefile('rb'))
+        if self.password:
+            self._send(conn, 'AUTH', self.password)
+        if self.db:
+            self._send(conn, 'SELECT', self.db)
+        return conn
+
+    def _encode(self, args):
+        parts = [b'*%d\r\n' % len(args)]
+        for arg in args:
+            if not isinstance(arg, bytes):
+                arg = str(arg).encode()
+            parts.append(b'$%d\r\n%s\r\n' % (len(arg), arg))
+        return b''.join(parts)
+
+    def _read_reply(self, reader):
+        line = reader.readline()
+        if not line:
+            raise ConnectionError("Connection closed by server")
+        kind, payload = line[:1], line[1:-2]
+        if kind == b'+':
+            return payload.decode()
+        if kind == b'-':
+            raise RedisError(payload.decode())
+        if kind == b':':
+            return int(payload)
+        if kind == b'$':
+            length = int(payload)
+            if length == -1:
+                return None
+            data = reader.read(length + 2)
+            return data[:-2]
+        if kind == b'*':
+            count = int(payload)
+            if count == -1:
+                return None
+            return [self._read_reply(reader) for _ in range(count)]
+        raise RedisError(f"Unexpected reply: {line!r}")
+
+    def _send(self, conn, *args):
+        sock, reader = conn
+        sock.sendall(self._encode(args))
+        return self._read_reply(reader)
+
+    def execute(self, *args):
+        """Send one command and return its decoded reply"""
+        with self.lock:
+            conn = self.idle.pop() if self.idle else None
+        if conn is None:
+            conn = self._connect()
+
+        try:
+            reply = self._send(conn, *args)
+        except RedisError:
+            self._release(conn)
+            raise
+        except (OSError, ValueError):
+            conn[0].close()
+            raise
+        self._release(conn)
+        return reply
+
+    def transaction(self, *commands):
+        """
+        Run commands atomically with MULTI/EXEC, sent in one write
+        Returns the list of their replies
+        """
+        commands = [('MULTI',), *commands, ('EXEC',)]
+        with self.lock:
+            conn = self.idle.pop() if self.idle else None
+        if conn is None:
+            conn = self._connect()
+
+        sock, reader = conn
+        try:
+            sock.sendall(b''.join(self._encode(args) for args in commands))
+            replies = [self._read_reply(reader) for _ in commands]
+        except (RedisError, OSError, ValueError):
+            # An error may leave replies unread, so the connection is not reused
+            sock.close()
+            raise
+        self._release(conn)
+        if replies[-1] is None:
+            raise RedisError("Transaction aborted")
+        return replies[-1]
+
+    def _release(self, conn):
+        with self.lock:
+            if len(self.idle) < self.max_idle:
+                self.idle.append(conn)
+                return
+        conn[0].close()
+
+class RedisCacheBackend:
+    """Cache shared by every worker and host through a Redis-protocol server"""
+
+    name = 'redis'
+
+    def __init__(self, url='redis://localhost:6379/0', prefix='sportsid:cache:', client=None):
+        self.client = client or RedisClient.from_url(url)
+        self.prefix = prefix
+
+    def get(self, key):
+        data = self.client.execute('GET', self.prefix + str(key))
+        return None if data is None else loads_value(data)
+
+    def set(self, key, value, ttl):
+        ttl_ms = int(ttl * 1000)
+        if ttl_ms <= 0:
+            return
+        data = dumps_value(value)
+        self.client.execute('SET', self.prefix + str(key), data, 'PX', ttl_ms)
+
+    def delete(self, key):
+        self.client.execute('DEL', self.prefix + str(key))
+
+    def get_counter(self, key):
+        value = self.client.execute('GET', f"{self.prefix}counter:{key}")
+        return int(value) if value is not None else 0
+
+    def incr(self, key, ttl=None, amount=1):
+        """Add amount to a counter; with a ttl it starts over ttl seconds after it was created"""
+        name = f"{self.prefix}counter:{key}"
+        if ttl is None:
+            return self.client.execute('INCRBY', name, amount)
+        # The key gets its expiry before it is incremented, in one transaction,
+        # so no failure in between can leave a counter that never expires
+        _, value = self.client.transaction(
+            ('SET', name, 0, 'PX', max(int(ttl * 1000), 1), 'NX'),
+            ('INCRBY', name, amount)
+        )
+        return value
+
+    def sweep(self):
+        """The server expires keys itself"""
+
+    def clear(self):
+        cursor = b'0'
+        while True:
+            cursor, keys = self.client.execute('SCAN', cursor, 'MATCH', self.prefix + '*', 'COUNT', 500)
+            keys = [k for k in keys if not k.startswith(f"{self.prefix}counter:".encode())]
+            if keys:
+                self.client.execute('DEL', *keys)
+            if cursor in (b'0', 0, '0'):
+                break
+
+    def get_stats(self):
+        return {'server': f"{self.client.host}:{self.client.port}/{self.client.db}"}
+
+def create_cache_backend(url=None, **options):
+    """
+    Build a backend from a URL: "memory" (default), "shm" or "shm:///path/to/dir",
+    or "redis://[:password@]host:port/db"
+    """
+    url = url or 'memory'
+    scheme = urlparse(url).scheme or url
+    if scheme == 'memory':
+        return MemoryCacheBackend(**options)
+    if scheme == 'shm':
+        path = urlparse(url).path or None
+        return SharedMemoryCacheBackend(path=path, max_bytes=options.get('max_bytes', 256 * 1024 * 1024))
+    if scheme == 'redis':
+        return RedisCacheBackend(url)
+    raise ValueError(f"Unknown cache backend: {url}")
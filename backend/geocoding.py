@@ -0,0 +1,129 @@
+"""
+Offline geocoding and distance utilities
+Coordinates come from the bundled ZIP-centroid table in data/zip_centroids.csv,
+so geocoding never calls an external service
+"""
+
+import csv
+import math
+import os
+import re
+import threading
+from typing import List, Optional, Tuple
+
+EARTH_RADIUS_MILES = 3958.8
+
+# Programs are bucketed into a fixed lat/lon grid; a radius search only
+# reads the grid cells overlapping the search circle's bounding box
+GRID_SIZE_DEGREES = 0.1
+GRID_COLUMNS = int(360 / GRID_SIZE_DEGREES) + 1
+
+ZIP_CENTROIDS_FILE = os.path.join(os.path.dirname(__file__), "data", "zip_centroids.csv")
+
+class ZipCentroids:
+    """Lookup table of ZIP code and city centroids, loaded on first use"""
+
+    def __init__(self, path=ZIP_CENTROIDS_FILE):
+        self.path = path
+        self.zips = None
+        self.cities = None
+        self.lock = threading.Lock()
+
+    def _load(self):
+        with self.lock:
+            if self.zips is not None:
+                return
+
+            zips = {}
+            city_points = {}
+            with open(self.path, newline='') as f:
+                for row in csv.DictReader(f):
+                    point = (float(row['latitude']), float(row['longitude']))
+                    zips[row['zip']] = point
+                    key = (row['city'].lower(), row['state'].upper())
+                    city_points.setdefault(key, []).append(point)
+
+            # A city's centroid is the mean of its ZIP centroids
+            self.cities = {
+                key: (sum(p[0] for p in points) / len(points), sum(p[1] for p in points) / len(points))
+                for key, points in city_points.items()
+            }
+            self.zips = zips
+
+    def lookup_zip(self, zip_code: Optional[str]) -> Optional[Tuple[float, float]]:
+        """Get the centroid of a ZIP code (ZIP+4 is accepted)"""
+        if not zip_code:
+            return None
+        self._load()
+        return self.zips.get(str(zip_code).strip()[:5])
+
+    def lookup_city(self, city: Optional[str], state: Optional[str] = None) -> Optional[Tuple[float, float]]:
+        """Get the centroid of a city, optionally disambiguated by state"""
+        if not city:
+            return None
+        self._load()
+        city = city.strip().lower()
+        if state:
+            return self.cities.get((city, state.strip().upper()))
+        for (name, _), point in self.cities.items():
+            if name == city:
+                return point
+        return None
+
+    def geocode(self, zip_code=None, city=None, state=None, text=None) -> Optional[Tuple[float, float]]:
+        """
+        Resolve coordinates from the most precise information available:
+        an explicit ZIP, the city, a ZIP inside free text, then a known
+        city name mentioned in free text (e.g. "Atlanta Sports Park")
+        """
+        point = self.lookup_zip(zip_code) or self.lookup_city(city, state)
+        if point or not text:
+            return point
+
+        match = re.search(r'\b(\d{5})(?:-\d{4})?\b', text)
+        if match and self.lookup_zip(match.group(1)):
+            return self.lookup_zip(match.group(1))
+
+        self._load()
+        lowered = text.lower()
+        for (name, _), point in sorted(self.cities.items(), key=lambda item: -len(item[0][0])):
+            if re.search(rf'\b{re.escape(name)}\b', lowered):
+                return point
+        return None
+
+def haversine_miles(lat1, lon1, lat2, lon2) -> float:
+    """Great-circle distance between two points in miles"""
+    lat1, lon1, lat2, lon2 = map(math.radians, (lat1, lon1, lat2, lon2))
+    a = math.sin((lat2 - lat1) / 2) ** 2 + math.cos(lat1) * math.cos(lat2) * math.sin((lon2 - lon1) / 2) ** 2
+    return 2 * EARTH_RADIUS_MILES * math.asin(math.sqrt(a))
+
+def _grid_row(lat):
+    return int(math.floor((lat + 90) / GRID_SIZE_DEGREES))
+
+def _grid_column(lon):
+    return int(math.floor((lon + 180) / GRID_SIZE_DEGREES))
+
+def grid_cell(lat, lon) -> int:
+    """Integer id of the grid cell containing a point"""
+    return _grid_row(lat) * GRID_COLUMNS + _grid_column(lon)
+
+def grid_cell_ranges(lat, lon, radius_miles) -> List[Tuple[int, int]]:
+    """
+    Cell id ranges covering the bounding box of a search circle
+    Cells in the same grid row have consecutive ids, so each row is one
+    (first, last) range that an index on the cell column can scan
+    """
+    lat_delta = math.degrees(radius_miles / EARTH_RADIUS_MILES)
+    # Longitude degrees shrink toward the poles; widen the box accordingly
+    cos_lat = max(math.cos(math.radians(min(abs(lat) + lat_delta, 89.9))), 1e-6)
+    lon_delta = min(lat_delta / cos_lat, 180)
+
+    first_column = _grid_column(max(lon - lon_delta, -180))
+    last_column = _grid_column(min(lon + lon_delta, 180))
+    return [
+        (row * GRID_COLUMNS + first_column, row * GRID_COLUMNS + last_column)
+        for row in range(_grid_row(max(lat - lat_delta, -90)), _grid_row(min(lat + lat_delta, 90)) + 1)
+    ]
+
+# Global centroid table
+zip_centroids = ZipCentroids()
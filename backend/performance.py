@@ -3,48 +3,276 @@ Performance monitoring and optimization utilities
 Supports 100 concurrent users and 95% uptime requirements
 """
 
+import sys
 import time
 import threading
+import hashlib
+from bisect import bisect_left
+from array import array
+from collections import OrderedDict, deque, namedtuple
 from functools import wraps
-from flask import request, g
+from flask import request, g, has_request_context, current_app, Response, jsonify
+from flask_jwt_extended import verify_jwt_in_request, get_jwt_identity
+from sqlalchemy import event, exc as sqlalchemy_exc
+from sqlalchemy.engine import Engine
+from sqlalchemy.pool import QueuePool
+from cache_backends import MemoryCacheBackend, create_cache_backend, register_cache_type
+from availability import HeartbeatRecorder, HEARTBEAT_FILE
 import logging
+from logging.handlers import QueueHandler, QueueListener, RotatingFileHandler
 from datetime import datetime, timedelta
+from contextlib import contextmanager
+from contextvars import ContextVar
+import atexit
+import json
+import math
+import queue
+import random
+import re
+import tempfile
+import weakref
 import psutil
 import os
+from urllib.parse import urlencode
 
 # Configure logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+class LatencyRing:
+    """
+    Fixed-size, array-backed ring buffer of the most recent latencies
+    Recording overwrites the oldest slot in O(1); percentiles sort a copy
+    of the window only when a report is requested
+    """
+    
+    def __init__(self, size=1024):
+        self.samples = array('d', bytes(8 * size))
+        self.size = size
+        self.index = 0
+        self.count = 0
+        self.total = 0
+    
+    def record(self, duration):
+        self.samples[self.index] = duration
+        self.index = (self.index + 1) % self.size
+        if self.count < self.size:
+            self.count += 1
+        self.total += 1
+    
+    def window(self):
+        """Samples currently held, in slot order"""
+        return self.samples[:self.count] if self.count < self.size else self.samples[:]
+    
+    def summary(self):
+        """Count, mean and p50/p95/p99/max over the window, in seconds"""
+        values = sorted(self.window())
+        if not values:
+            return {'count': self.total, 'window': 0}
+        
+        def percentile(p):
+            return values[min(int(p * len(values)), len(values) - 1)]
+        
+        return {
+            'count': self.total,
+            'window': len(values),
+            'mean': sum(values) / len(values),
+            'p50': percentile(0.50),
+            'p95': percentile(0.95),
+            'p99': percentile(0.99),
+            'max': values[-1]
+        }
+
+class SystemMetricsSampler:
+    """
+    Daemon thread sampling host and process resource usage at a fixed interval
+    into a short in-memory time series, so reports read the latest sample
+    instead of blocking on psutil.cpu_percent(interval=...)
+    """
+    
+    TREND_WINDOWS = (('1m', 60), ('5m', 300), ('15m', 900))
+    
+    def __init__(self, interval=5.0, history=180, disk_path='/'):
+        self.interval = interval
+        self.samples = deque(maxlen=history)
+        self.disk_path = disk_path
+        self.process = psutil.Process()
+        self.thread = None
+        self.stopped = threading.Event()
+        self.lock = threading.Lock()
+    
+    def sample(self):
+        """Take one sample and append it to the series"""
+        # interval=None compares against the previous call and returns immediately
+        cpu_percent = psutil.cpu_percent(interval=None)
+        memory = psutil.virtual_memory()
+        disk = psutil.disk_usage(self.disk_path)
+        with self.process.oneshot():
+            snapshot = {
+                'timestamp': time.time(),
+                'cpu_percent': cpu_percent,
+                'memory_percent': memory.percent,
+                'memory_available_gb': memory.available / (1024**3),
+                'disk_percent': disk.percent,
+                'disk_free_gb': disk.free / (1024**3),
+                'process_rss_mb': self.process.memory_info().rss / (1024**2),
+                'process_threads': self.process.num_threads(),
+                'process_open_fds': self.process.num_fds() if hasattr(self.process, 'num_fds') else None
+            }
+        self.samples.append(snapshot)
+        return snapshot
+    
+    def _run(self):
+        while not self.stopped.wait(self.interval):
+            try:
+                self.sample()
+            except Exception as e:
+                logger.error(f"Error sampling system metrics: {e}")
+    
+    def start(self):
+        """Start the sampling thread once per process"""
+        with self.lock:
+            if self.thread is not None and self.thread.is_alive():
+                return
+            # Prime cpu_percent so the first background sample has a baseline
+            self.sample()
+            self.stopped.clear()
+            self.thread = threading.Thread(target=self._run, name='system-metrics-sampler', daemon=True)
+            self.thread.start()
+    
+    def stop(self):
+        self.stopped.set()
+    
+    def latest(self):
+        """Most recent sample, starting the sampler on first use"""
+        if self.thread is None:
+            self.start()
+        return dict(self.samples[-1]) if self.samples else {}
+    
+    def trends(self):
+        """Average and change of each metric over the trailing windows"""
+        samples = list(self.samples)
+        if not samples:
+            return {}
+        
+        now = samples[-1]['timestamp']
+        metrics = ('cpu_percent', 'memory_percent', 'disk_percent', 'process_rss_mb', 'process_threads',
+                   'process_open_fds')
+        trends = {}
+        for name, seconds in self.TREND_WINDOWS:
+            window = [s for s in samples if now - s['timestamp'] <= seconds]
+            trend = {'samples': len(window)}
+            for metric in metrics:
+                values = [s[metric] for s in window if s[metric] is not None]
+                if values:
+                    trend[metric] = {
+                        'avg': sum(values) / len(values),
+                        'max': max(values),
+                        'change': values[-1] - values[0]
+                    }
+            trends[name] = trend
+        return trends
+
+def status_class(status):
+    """Bucket an HTTP status code as "2xx", "4xx", ..."""
+    return f"{status // 100}xx" if status else 'unknown'
+
 class PerformanceMonitor:
     """Monitor application performance and resource usage"""
     
-    def __init__(self):
-        self.request_times = []
+    def __init__(self, window_size=1024):
+        self.window_size = window_size
+        self.request_times = LatencyRing(window_size)
+        self.endpoint_times = {}  # (endpoint, status class) -> LatencyRing
+        self.endpoint_queries = {}  # endpoint -> SQL statement totals
         self.error_count = 0
         self.total_requests = 0
         self.start_time = datetime.utcnow()
         self.max_concurrent_users = 100
         self.target_uptime = 0.95
+        self.max_response_time = 2.0
+        self.max_error_rate = 0.05
+        self.lock = threading.Lock()
+        self.heartbeat = HeartbeatRecorder(
+            path=os.environ.get('HEARTBEAT_FILE', HEARTBEAT_FILE),
+            interval=float(os.environ.get('HEARTBEAT_INTERVAL', 10))
+        )
+        self.system_sampler = SystemMetricsSampler(
+            interval=float(os.environ.get('SYSTEM_METRICS_INTERVAL', 5)),
+            history=int(os.environ.get('SYSTEM_METRICS_HISTORY', 180))
+        )
         
-    def record_request_time(self, duration):
-        """Record request processing time"""
-        self.request_times.append(duration)
-        self.total_requests += 1
+    def record_request_time(self, duration, endpoint=None, status=None, queries=None, suspect=None):
+        """
+        Record request processing time, overall and per endpoint and status
+        class, and with queries its SQL statements (see record_queries)
+        """
+        key = (endpoint or 'unknown', status_class(status))
+        self.heartbeat.record_outcome(status is not None and status >= 500, duration > self.max_response_time)
+        with self.lock:
+            self.request_times.record(duration)
+            self.total_requests += 1
+            
+            ring = self.endpoint_times.get(key)
+            if ring is None:
+                ring = self.endpoint_times[key] = LatencyRing(self.window_size)
+            ring.record(duration)
+            if queries is not None:
+                self._add_queries(key[0], queries, suspect)
+    
+    def record_queries(self, endpoint, stats, suspect):
+        """Aggregate one request's SQL statement count and DB time per endpoint"""
+        with self.lock:
+            self._add_queries(endpoint, stats, suspect)
+    
+    def _add_queries(self, endpoint, stats, suspect):
+        totals = self.endpoint_queries.get(endpoint)
+        if totals is None:
+            totals = self.endpoint_queries[endpoint] = {
+                'requests': 0, 'queries': 0, 'db_time': 0.0, 'max_queries': 0,
+                'n_plus_one_requests': 0, 'n_plus_one_example': None
+            }
+        totals['requests'] += 1
+        if stats.count:
+            totals['queries'] += stats.count
+            totals['db_time'] += stats.time
+            totals['max_queries'] = max(totals['max_queries'], stats.count)
+        if suspect:
+            totals['n_plus_one_requests'] += 1
+            totals['n_plus_one_example'] = suspect
+    
+    def get_database_report(self):
+        """SQL statements and DB time per endpoint, with likely N+1 requests"""
+        with self.lock:
+            endpoints = {endpoint: dict(totals) for endpoint, totals in self.endpoint_queries.items()}
         
-        # Keep only last 1000 requests for memory efficiency
-        if len(self.request_times) > 1000:
-            self.request_times = self.request_times[-1000:]
+        for totals in endpoints.values():
+            totals['avg_queries'] = totals['queries'] / totals['requests']
+            totals['avg_db_time'] = totals['db_time'] / totals['requests']
+        return dict(sorted(endpoints.items()))
     
     def record_error(self):
         """Record an error occurrence"""
-        self.error_count += 1
+        with self.lock:
+            self.error_count += 1
     
     def get_average_response_time(self):
-        """Get average response time"""
-        if not self.request_times:
+        """Get average response time over the recent window"""
+        with self.lock:
+            window = self.request_times.window()
+        if not window:
             return 0
-        return sum(self.request_times) / len(self.request_times)
+        return sum(window) / len(window)
+    
+    def get_latency_report(self):
+        """Latency percentiles per endpoint and status class"""
+        with self.lock:
+            summaries = {key: ring.summary() for key, ring in self.endpoint_times.items()}
+        
+        report = {}
+        for (endpoint, status), summary in sorted(summaries.items()):
+            report.setdefault(endpoint, {})[status] = summary
+        return report
     
     def get_error_rate(self):
         """Get current error rate"""
@@ -52,28 +280,28 @@ class PerformanceMonitor:
             return 0
         return self.error_count / self.total_requests
     
-    def get_uptime(self):
-        """Calculate current uptime percentage"""
-        uptime_seconds = (datetime.utcnow() - self.start_time).total_seconds()
-        # Assuming 24/7 operation, calculate uptime
-        # In production, this would track actual downtime
-        return 1.0  # Placeholder - implement actual uptime tracking
+    def get_slo_report(self):
+        """Availability over 1h/24h/30d and error-budget burn rates from the heartbeat log"""
+        # Latency SLO: the same share of requests may exceed max_response_time as may fail
+        return self.heartbeat.report({
+            'errors': self.max_error_rate,
+            'latency': self.max_error_rate,
+            'uptime': 1 - self.target_uptime
+        })
+    
+    def get_uptime(self, slo_report=None):
+        """Fraction of the last 24 hours in which any worker was alive"""
+        slo_report = slo_report or self.get_slo_report()
+        return slo_report['availability']['24h']['uptime']
     
     def get_system_metrics(self):
-        """Get current system resource usage"""
+        """Get the latest sampled system resource usage and its recent trends"""
         try:
-            cpu_percent = psutil.cpu_percent(interval=1)
-            memory = psutil.virtual_memory()
-            disk = psutil.disk_usage('/')
-            
-            return {
-                'cpu_percent': cpu_percent,
-                'memory_percent': memory.percent,
-                'memory_available_gb': memory.available / (1024**3),
-                'disk_percent': disk.percent,
-                'disk_free_gb': disk.free / (1024**3),
-                'database_type': 'PostgreSQL'
-            }
+            metrics = self.system_sampler.latest()
+            metrics['database_type'] = 'PostgreSQL'
+            metrics['sample_interval'] = self.system_sampler.interval
+            metrics['trends'] = self.system_sampler.trends()
+            return metrics
         except Exception as e:
             logger.error(f"Error getting system metrics: {e}")
             return {}
@@ -82,23 +310,27 @@ class PerformanceMonitor:
         """Check if performance is within acceptable thresholds"""
         avg_response_time = self.get_average_response_time()
         error_rate = self.get_error_rate()
-        uptime = self.get_uptime()
+        slo_report = self.get_slo_report()
+        uptime = self.get_uptime(slo_report)
         system_metrics = self.get_system_metrics()
         
         issues = []
         
         # Response time threshold (should be under 2 seconds)
-        if avg_response_time > 2.0:
+        if avg_response_time > self.max_response_time:
             issues.append(f"High response time: {avg_response_time:.2f}s")
         
         # Error rate threshold (should be under 5%)
-        if error_rate > 0.05:
+        if error_rate > self.max_error_rate:
             issues.append(f"High error rate: {error_rate:.2%}")
         
         # Uptime threshold (should be above 95%)
         if uptime < self.target_uptime:
             issues.append(f"Low uptime: {uptime:.2%}")
         
+        # Error budgets burning fast enough to exhaust them early
+        issues.extend(slo_report['alerts'])
+        
         # System resource thresholds
         if system_metrics.get('cpu_percent', 0) > 80:
             issues.append(f"High CPU usage: {system_metrics['cpu_percent']:.1f}%")
@@ -113,6 +345,8 @@ class PerformanceMonitor:
                 'avg_response_time': avg_response_time,
                 'error_rate': error_rate,
                 'uptime': uptime,
+                'availability': slo_report['availability'],
+                'burn_rates': slo_report['burn_rates'],
                 'total_requests': self.total_requests,
                 'system': system_metrics
             }
@@ -121,153 +355,1255 @@ class PerformanceMonitor:
 # Global performance monitor instance
 performance_monitor = PerformanceMonitor()
 
-def monitor_performance(f):
-    """Decorator to monitor function performance"""
-    @wraps(f)
-    def decorated_function(*args, **kwargs):
-        start_time = time.time()
+# Upper bounds (seconds) of the request latency histogram buckets
+HISTOGRAM_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+OPENMETRICS_CONTENT_TYPE = 'application/openmetrics-text; version=1.0.0; charset=utf-8'
+
+def _label_value(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+def _labels(**labels):
+    return '{' + ','.join(f'{name}="{_label_value(value)}"' for name, value in labels.items()) + '}'
+
+class RequestMetrics:
+    """
+    Request counters and latency histograms labelled by route template,
+    method and status, rendered in the OpenMetrics text format
+    """
+    
+    def __init__(self, buckets=HISTOGRAM_BUCKETS):
+        self.buckets = buckets
+        self.requests = {}  # (route, method, status) -> count
+        self.histograms = {}  # (route, method) -> [per-bucket counts incl. +Inf, sum]
+        self.in_progress = 0
+        self.lock = threading.Lock()
+    
+    def started(self):
+        with self.lock:
+            self.in_progress += 1
+    
+    def finished(self):
+        with self.lock:
+            self.in_progress -= 1
+    
+    def observe(self, route, method, status, duration, finished=False):
+        """Count one request and add its duration to the route's histogram; finished also ends it"""
+        bucket = bisect_left(self.buckets, duration)
+        with self.lock:
+            if finished:
+                self.in_progress -= 1
+            key = (route, method, status)
+            self.requests[key] = self.requests.get(key, 0) + 1
+            histogram = self.histograms.get((route, method))
+            if histogram is None:
+                histogram = self.histograms[(route, method)] = [[0] * (len(self.buckets) + 1), 0.0]
+            histogram[0][bucket] += 1
+            histogram[1] += duration
+    
+    def render(self):
+        """OpenMetrics lines for the request metrics"""
+        with self.lock:
+            requests = sorted(self.requests.items())
+            histograms = sorted((key, (list(counts), total)) for key, (counts, total) in self.histograms.items())
+            in_progress = self.in_progress
+        
+        lines = [
+            '# TYPE sportsid_http_requests counter',
+            '# HELP sportsid_http_requests HTTP requests handled, by route template, method and status.'
+        ]
+        for (route, method, status), count in requests:
+            lines.append(f'sportsid_http_requests_total{_labels(route=route, method=method, status=status)} {count}')
+        
+        lines += [
+            '# TYPE sportsid_http_request_duration_seconds histogram',
+            '# HELP sportsid_http_request_duration_seconds HTTP request latency, by route template and method.'
+        ]
+        bounds = [repr(float(b)) for b in self.buckets] + ['+Inf']
+        for (route, method), (counts, total) in histograms:
+            cumulative = 0
+            for bound, count in zip(bounds, counts):
+                cumulative += count
+                lines.append(f'sportsid_http_request_duration_seconds_bucket'
+                             f'{_labels(route=route, method=method, le=bound)} {cumulative}')
+            lines.append(f'sportsid_http_request_duration_seconds_count{_labels(route=route, method=method)} {cumulative}')
+            lines.append(f'sportsid_http_request_duration_seconds_sum{_labels(route=route, method=method)} {total}')
         
+        lines += [
+            '# TYPE sportsid_http_requests_in_progress gauge',
+            '# HELP sportsid_http_requests_in_progress HTTP requests currently being handled.',
+            f'sportsid_http_requests_in_progress {in_progress}'
+        ]
+        return lines
+
+# Global request metrics
+request_metrics = RequestMetrics()
+
+def record_request(route, method, status, duration, endpoint=None, queries=None, suspect=None, finished=False):
+    """
+    Record one finished request in the latency rings and the OpenMetrics
+    registry, with its SQL statements if given; finished also takes it out
+    of the in-progress gauge
+    """
+    if status >= 500:
+        performance_monitor.record_error()
+    performance_monitor.record_request_time(duration, endpoint or f"{method} {route}", status, queries, suspect)
+    request_metrics.observe(route, method, status, duration, finished)
+
+class QueryStats:
+    """SQL statements issued while handling one request"""
+    
+    __slots__ = ('count', 'time', 'statements')
+    
+    def __init__(self):
+        self.count = 0
+        self.time = 0.0
+        self.statements = {}  # statement text -> executions
+    
+    def record(self, statement, duration):
+        self.count += 1
+        self.time += duration
+        self.statements[statement] = self.statements.get(statement, 0) + 1
+    
+    def n_plus_one(self, max_queries, max_repeats):
+        """
+        Describe the request as a likely N+1 if it issued more than
+        max_queries statements or ran one statement shape max_repeats times
+        Statements are compared as compiled, i.e. with bound parameters, so
+        the same SELECT with different ids has one shape
+        """
+        if not self.statements:
+            return None
+        statement, repeats = max(self.statements.items(), key=lambda item: item[1])
+        if self.count <= max_queries and repeats < max_repeats:
+            return None
+        return {'queries': self.count, 'repeats': repeats, 'statement': ' '.join(statement.split())[:200]}
+
+class Trace:
+    """Spans recorded while handling one request"""
+    
+    __slots__ = ('trace_id', 'start', 'spans', 'dropped')
+    
+    def __init__(self, trace_id, start=None):
+        self.trace_id = trace_id
+        self.start = time.perf_counter() if start is None else start
+        self.spans = []
+        self.dropped = 0
+    
+    def add_span(self, name, start, duration, **attributes):
+        # An N+1 request can issue thousands of statements; keep the first spans only
+        if len(self.spans) >= MAX_TRACE_SPANS:
+            self.dropped += 1
+            return
+        self.spans.append({
+            'name': name,
+            'start_ms': round((start - self.start) * 1000, 3),
+            'duration_ms': round(duration * 1000, 3),
+            **attributes
+        })
+
+MAX_TRACE_SPANS = 500
+TRACE_ID_PATTERN = re.compile(r'^[0-9A-Za-z-]{8,64}$')
+
+# The trace of the request being handled; a context variable rather than
+# request state so spans recorded off the request context still find it
+current_trace = ContextVar('current_trace', default=None)
+
+@contextmanager
+def span(name, **attributes):
+    """
+    Time a block as a span of the current request's trace; a no-op outside
+    a traced request. Yields the attribute dict so callers can add results
+    """
+    trace = current_trace.get()
+    if trace is None:
+        yield attributes
+        return
+    
+    start = time.perf_counter()
+    try:
+        yield attributes
+    except Exception as e:
+        attributes['error'] = repr(e)[:200]
+        raise
+    finally:
+        trace.add_span(name, start, time.perf_counter() - start, **attributes)
+
+# Slow-request traces go through a queue to a background thread, so the
+# request thread never waits on disk I/O
+trace_logger = logging.getLogger('sportsid.traces')
+trace_logger.propagate = False
+trace_log_listener = None
+
+def configure_trace_log(path, max_bytes=10 * 1024 * 1024, backup_count=5):
+    """Write slow-request traces as JSON lines to a size-rotated file via a QueueListener"""
+    global trace_log_listener
+    if trace_log_listener is not None:
+        return
+    
+    file_handler = RotatingFileHandler(path, maxBytes=max_bytes, backupCount=backup_count, delay=True)
+    file_handler.setFormatter(logging.Formatter('%(message)s'))
+    log_queue = queue.SimpleQueue()
+    trace_logger.addHandler(QueueHandler(log_queue))
+    trace_logger.setLevel(logging.INFO)
+    trace_log_listener = QueueListener(log_queue, file_handler)
+    trace_log_listener.start()
+    atexit.register(trace_log_listener.stop)
+
+def log_slow_trace(trace, route, status, duration, query_stats):
+    """Queue one slow request's trace for the JSONL trace log"""
+    trace_logger.info(json.dumps({
+        'trace_id': trace.trace_id,
+        'timestamp': datetime.utcnow().isoformat() + 'Z',
+        'route': route,
+        'path': request.path,
+        'status': status,
+        'duration_ms': round(duration * 1000, 3),
+        'db_queries': query_stats.count if query_stats else 0,
+        'spans': trace.spans,
+        'dropped_spans': trace.dropped
+    }, default=str))
+
+QUERY_STATS_KEY = 'sportsid.query_stats'
+EMPTY_QUERY_STATS = QueryStats()
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    # Kept on the statement's own execution context, which is discarded if it
+    # raises (after_cursor_execute never fires then), rather than on the pooled connection
+    if context is not None:
+        context._query_start = time.perf_counter()
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    end = time.perf_counter()
+    start = getattr(context, '_query_start', None)
+    if start is None:
+        return
+    duration = end - start
+    trace = current_trace.get()
+    if trace is not None:
+        trace.add_span('db', end - duration, duration, statement=' '.join(statement.split())[:200])
+    if has_request_context():
+        environ = request.environ
+        stats = environ.get(QUERY_STATS_KEY)
+        if stats is None:
+            stats = environ[QUERY_STATS_KEY] = QueryStats()
+        stats.record(statement, duration)
+
+def instrument_queries():
+    """Count and time SQL statements per request on every SQLAlchemy engine"""
+    if not event.contains(Engine, 'before_cursor_execute', _before_cursor_execute):
+        event.listen(Engine, 'before_cursor_execute', _before_cursor_execute)
+        event.listen(Engine, 'after_cursor_execute', _after_cursor_execute)
+
+class Profile:
+    """Stack samples from one profiling run, exportable as collapsed stacks or speedscope JSON"""
+    
+    def __init__(self, frames, samples, hz, duration, overhead):
+        self.frames = frames  # [(function, file, first line)]
+        self.samples = samples  # (endpoint, (frame index, ...) root first) -> count
+        self.hz = hz
+        self.duration = duration
+        self.overhead = overhead
+    
+    def _frame_label(self, index):
+        function, filename, line = self.frames[index]
+        return f"{function} ({os.path.basename(filename)}:{line})".replace(';', ':')
+    
+    def to_collapsed(self):
+        """Brendan Gregg's collapsed-stack format, one "endpoint;root;...;leaf count" line per stack"""
+        lines = []
+        for (endpoint, stack), count in sorted(self.samples.items()):
+            labels = [endpoint.replace(';', ':')] + [self._frame_label(index) for index in stack]
+            lines.append(f"{';'.join(labels)} {count}")
+        return '\n'.join(lines) + '\n'
+    
+    def to_speedscope(self):
+        """speedscope file format with one sampled profile per endpoint"""
+        by_endpoint = {}
+        for (endpoint, stack), count in self.samples.items():
+            by_endpoint.setdefault(endpoint, []).append((list(stack), count / self.hz))
+        
+        profiles = []
+        for endpoint, stacks in sorted(by_endpoint.items()):
+            total = sum(weight for _, weight in stacks)
+            profiles.append({
+                'type': 'sampled',
+                'name': endpoint,
+                'unit': 'seconds',
+                'startValue': 0,
+                'endValue': total,
+                'samples': [stack for stack, _ in stacks],
+                'weights': [weight for _, weight in stacks]
+            })
+        
+        return {
+            '$schema': 'https://www.speedscope.app/file-format-schema.json',
+            'name': f"SportsID profile ({self.duration:.1f}s at {self.hz}Hz)",
+            'exporter': 'sportsid',
+            'shared': {'frames': [{'name': function, 'file': filename, 'line': line}
+                                  for function, filename, line in self.frames]},
+            'profiles': profiles
+        }
+
+class SamplingProfiler:
+    """
+    Opt-in in-process sampling profiler
+    While a profile runs, the request hooks register each request thread
+    with its endpoint and the profiling thread samples their stacks from
+    sys._current_frames() hz times a second; otherwise the hooks only check
+    the running flag
+    """
+    
+    def __init__(self, max_depth=128):
+        self.max_depth = max_depth
+        self.running = False
+        self.request_threads = {}  # thread id -> endpoint
+        self.lock = threading.Lock()
+    
+    def enter(self, endpoint):
+        self.request_threads[threading.get_ident()] = endpoint
+    
+    def leave(self):
+        self.request_threads.pop(threading.get_ident(), None)
+    
+    def profile(self, seconds, hz=100):
+        """Sample request threads for the given number of seconds; one profile at a time"""
+        if not self.lock.acquire(blocking=False):
+            raise RuntimeError("A profile is already running")
+        
+        frame_indexes = {}  # code object -> index into frames
+        frames = []
+        samples = {}
+        sampler_cpu = 0.0
+        interval = 1.0 / hz
+        started = time.perf_counter()
         try:
-            result = f(*args, **kwargs)
-            return result
-        except Exception as e:
-            performance_monitor.record_error()
-            raise e
+            self.running = True
+            next_sample = started
+            while True:
+                next_sample += interval
+                delay = next_sample - time.perf_counter()
+                if delay > 0:
+                    time.sleep(delay)
+                if time.perf_counter() - started >= seconds:
+                    break
+                
+                cpu_start = time.thread_time()
+                current_frames = sys._current_frames()
+                for ident, endpoint in self.request_threads.copy().items():
+                    frame = current_frames.get(ident)
+                    stack = []
+                    while frame is not None and len(stack) < self.max_depth:
+                        code = frame.f_code
+                        index = frame_indexes.get(code)
+                        if index is None:
+                            index = frame_indexes[code] = len(frames)
+                            frames.append((code.co_name, code.co_filename, code.co_firstlineno))
+                        stack.append(index)
+                        frame = frame.f_back
+                    if stack:
+                        key = (endpoint, tuple(reversed(stack)))
+                        samples[key] = samples.get(key, 0) + 1
+                del current_frames
+                sampler_cpu += time.thread_time() - cpu_start
         finally:
-            duration = time.time() - start_time
-            performance_monitor.record_request_time(duration)
+            self.running = False
+            self.request_threads.clear()
+            self.lock.release()
+        
+        duration = time.perf_counter() - started
+        return Profile(frames, samples, hz, duration, sampler_cpu / duration)
+
+# Global sampling profiler
+sampling_profiler = SamplingProfiler()
+
+class RequestState:
+    """One request's instrumentation state, kept under a single environ key"""
     
-    return decorated_function
+    __slots__ = ('start', 'trace', 'token', 'recorded')
+    
+    def __init__(self, start):
+        self.start = start
+        self.trace = None
+        self.token = None  # resets current_trace at teardown
+        self.recorded = False
+
+REQUEST_STATE_KEY = 'sportsid.request_state'
+# Per-request instrumentation state kept in the WSGI environ
+REQUEST_STATE_KEYS = (REQUEST_STATE_KEY, QUERY_STATS_KEY)
 
-class ConnectionPool:
-    """Simple connection pool for database optimization"""
+def isolated_request_context(f):
+    """
+    Wrap f to run in a new request context over a copy of the current
+    request's environ, without its instrumentation state
+    Unlike copy_current_request_context, which shares the request object,
+    tearing the new context down leaves the original request untouched
+    """
+    app = current_app._get_current_object()
+    environ = {key: value for key, value in request.environ.items() if key not in REQUEST_STATE_KEYS}
     
-    def __init__(self, max_connections=20):
-        self.max_connections = max_connections
-        self.connections = []
+    @wraps(f)
+    def wrapper(*args, **kwargs):
+        with app.request_context(environ):
+            return f(*args, **kwargs)
+    
+    return wrapper
+
+def query_suspect(app, endpoint, stats):
+    """Flag and log a request's SQL statements as a likely N+1, or None"""
+    if not stats.count:
+        return None
+    suspect = stats.n_plus_one(app.config['N_PLUS_ONE_MAX_QUERIES'], app.config['N_PLUS_ONE_MAX_REPEATS'])
+    if suspect:
+        logger.warning(f"Possible N+1 in {endpoint}: {suspect['queries']} queries, "
+                       f"{suspect['repeats']}x {suspect['statement']}")
+    return suspect
+
+def instrument_app(app):
+    """
+    Time and count every request via app-wide hooks, labelled by route
+    template (e.g. /api/sports/programs/<org_name>) rather than raw path
+    so label cardinality stays bounded; unmatched paths share one label
+    """
+    app.config.setdefault('DB_QUERY_HEADERS', os.environ.get('DB_QUERY_HEADERS', '').lower() in ('1', 'true', 'yes'))
+    app.config.setdefault('N_PLUS_ONE_MAX_QUERIES', int(os.environ.get('N_PLUS_ONE_MAX_QUERIES', 30)))
+    app.config.setdefault('N_PLUS_ONE_MAX_REPEATS', int(os.environ.get('N_PLUS_ONE_MAX_REPEATS', 10)))
+    app.config.setdefault('TRACING', os.environ.get('TRACING', 'true').lower() in ('1', 'true', 'yes'))
+    app.config.setdefault('TRACE_SLOW_THRESHOLD', float(os.environ.get('TRACE_SLOW_MS', 1000)) / 1000)
+    app.config.setdefault('TRACE_LOG_FILE', os.environ.get('TRACE_LOG_FILE',
+                                                           os.path.join(tempfile.gettempdir(), 'sportsid-traces.jsonl')))
+    instrument_queries()
+    configure_trace_log(app.config['TRACE_LOG_FILE'])
+    performance_monitor.heartbeat.start()
+    config = app.config
+    
+    # These hooks run on every request. Each attribute read through the
+    # request proxy costs about a microsecond, so every hook resolves it once,
+    # and all of a request's state lives in one RequestState in the environ;
+    # tracing and profiling cost nothing unless enabled
+    @app.before_request
+    def start_request_timer():
+        current = request._get_current_object()
+        environ = current.environ
+        state = environ[REQUEST_STATE_KEY] = RequestState(time.perf_counter())
+        request_metrics.started()
+        
+        if config['TRACING']:
+            # Trace ids only need to be unique, not unpredictable; getrandbits avoids a urandom syscall
+            trace_id = environ.get('HTTP_X_TRACE_ID')
+            if not trace_id or not TRACE_ID_PATTERN.match(trace_id):
+                trace_id = random.getrandbits(128).to_bytes(16, 'big').hex()
+            state.trace = Trace(trace_id, state.start)
+            state.token = current_trace.set(state.trace)
+        if sampling_profiler.running:
+            rule = current.url_rule
+            sampling_profiler.enter(f"{current.method} {rule.rule if rule is not None else 'unmatched'}")
+    
+    @app.after_request
+    def record_request_metrics(response):
+        current = request._get_current_object()
+        state = current.environ.get(REQUEST_STATE_KEY)
+        if state is None or state.recorded:
+            return response
+        duration = time.perf_counter() - state.start
+        rule = current.url_rule
+        route = rule.rule if rule is not None else 'unmatched'
+        method = current.method
+        endpoint = f"{method} {route}"
+        status = response.status_code
+        query_stats = current.environ.get(QUERY_STATS_KEY, EMPTY_QUERY_STATS)
+        record_request(route, method, status, duration, endpoint, query_stats,
+                       query_suspect(app, endpoint, query_stats), finished=True)
+        state.recorded = True
+        
+        if config['DB_QUERY_HEADERS']:
+            response.headers['X-DB-Queries'] = str(query_stats.count)
+            response.headers['X-DB-Time'] = f"{query_stats.time * 1000:.2f}"
+        
+        trace = state.trace
+        if trace is not None:
+            # Only this hook sets the header, so add skips set's scan for an existing one
+            response.headers.add('X-Trace-Id', trace.trace_id)
+            if duration >= config['TRACE_SLOW_THRESHOLD']:
+                # Everything between the first hook and this one: other hooks and the view
+                trace.add_span('view', state.start, duration, endpoint=rule.endpoint if rule is not None else None)
+                log_slow_trace(trace, endpoint, status, duration, query_stats)
+        return response
+    
+    @app.teardown_request
+    def stop_request_timer(error=None):
+        state = request._get_current_object().environ.pop(REQUEST_STATE_KEY, None)
+        if state is not None:
+            if not state.recorded:
+                request_metrics.finished()
+            if state.token is not None:
+                try:
+                    current_trace.reset(state.token)
+                except ValueError:
+                    # Torn down in a different context than the one it started in
+                    current_trace.set(None)
+        if sampling_profiler.request_threads:
+            sampling_profiler.leave()
+    
+    return app
+
+# Upper bounds (seconds) of the connection checkout wait histogram buckets
+POOL_WAIT_BUCKETS = (0.0005, 0.001, 0.005, 0.01, 0.05, 0.1, 0.5, 1.0, 5.0, 30.0)
+
+class MonitoredQueuePool(QueuePool):
+    """
+    QueuePool that reports to pool_monitor how long each checkout waited
+    for a connection, including opening a new one
+    Use it as the engine's poolclass
+    """
+    
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        pool_monitor.register(self)
+    
+    def _do_get(self):
+        start = time.perf_counter()
+        try:
+            return super()._do_get()
+        except sqlalchemy_exc.TimeoutError:
+            pool_monitor.record_timeout()
+            raise
+        finally:
+            pool_monitor.record_wait(time.perf_counter() - start)
+
+class PoolMonitor:
+    """
+    Connection pool telemetry: checkout wait histogram and percentiles,
+    in-use/idle/overflow gauges, and connections held longer than
+    leak_threshold seconds together with the endpoint holding them
+    """
+    
+    def __init__(self, leak_threshold=5.0, buckets=POOL_WAIT_BUCKETS):
+        self.leak_threshold = leak_threshold
+        self.buckets = buckets
+        self.pools = weakref.WeakSet()
+        self.wait_times = LatencyRing()
+        self.wait_histogram = [0] * (len(buckets) + 1)
+        self.wait_total = 0.0
+        self.timeouts = 0
+        self.checked_out = {}  # id(connection record) -> (checked out at, endpoint)
+        self.long_holds = {}  # endpoint -> [count, longest hold]
+        self.recent_long_holds = deque(maxlen=20)
         self.lock = threading.Lock()
     
-    def get_connection(self):
-        """Get a connection from the pool"""
+    def register(self, pool):
+        self.pools.add(pool)
+    
+    def record_wait(self, duration):
+        bucket = bisect_left(self.buckets, duration)
         with self.lock:
-            if self.connections:
-                return self.connections.pop()
-            return None
+            self.wait_times.record(duration)
+            self.wait_histogram[bucket] += 1
+            self.wait_total += duration
     
-    def return_connection(self, connection):
-        """Return a connection to the pool"""
+    def record_timeout(self):
         with self.lock:
-            if len(self.connections) < self.max_connections:
-                self.connections.append(connection)
+            self.timeouts += 1
+    
+    def checkout(self, connection_record):
+        if has_request_context():
+            current = request._get_current_object()
+            rule = current.url_rule
+            endpoint = f"{current.method} {rule.rule if rule is not None else 'unmatched'}"
+        else:
+            endpoint = f"thread {threading.current_thread().name}"
+        with self.lock:
+            self.checked_out[id(connection_record)] = (time.perf_counter(), endpoint)
+    
+    def checkin(self, connection_record):
+        with self.lock:
+            held = self.checked_out.pop(id(connection_record), None)
+            if held is None:
+                return
+            duration = time.perf_counter() - held[0]
+            if duration < self.leak_threshold:
+                return
+            endpoint = held[1]
+            totals = self.long_holds.setdefault(endpoint, [0, 0.0])
+            totals[0] += 1
+            totals[1] = max(totals[1], duration)
+            self.recent_long_holds.append({'endpoint': endpoint, 'held_seconds': round(duration, 3),
+                                           'returned_at': datetime.utcnow().isoformat()})
+        logger.warning(f"Connection held for {duration:.1f}s by {endpoint}")
+    
+    def get_stats(self):
+        """Pool gauges, checkout waits, and long-held or still-held (possibly leaked) connections"""
+        now = time.perf_counter()
+        with self.lock:
+            waits = self.wait_times.summary()
+            timeouts = self.timeouts
+            held_now = [
+                {'endpoint': endpoint, 'held_seconds': round(now - since, 3)}
+                for since, endpoint in self.checked_out.values() if now - since >= self.leak_threshold
+            ]
+            long_holds = {endpoint: {'count': count, 'longest_seconds': round(longest, 3)}
+                          for endpoint, (count, longest) in self.long_holds.items()}
+            recent = list(self.recent_long_holds)
+        
+        pools = []
+        for pool in list(self.pools):
+            capacity = pool.size() + max(pool._max_overflow, 0)
+            pools.append({
+                'size': pool.size(),
+                'max_overflow': pool._max_overflow,
+                'in_use': pool.checkedout(),
+                'idle': pool.checkedin(),
+                'overflow': max(pool.overflow(), 0),
+                'utilization': pool.checkedout() / capacity if capacity else 0,
+                # Multiply by the worker count and keep it below Postgres max_connections
+                'max_connections_per_worker': capacity
+            })
+        
+        return {
+            'pools': pools,
+            'checkout_wait': waits,
+            'checkout_timeouts': timeouts,
+            'leak_threshold_seconds': self.leak_threshold,
+            'held_over_threshold': held_now,
+            'long_holds': long_holds,
+            'recent_long_holds': recent
+        }
+    
+    def render(self):
+        """OpenMetrics lines for the checkout wait histogram and pool gauges"""
+        with self.lock:
+            counts = list(self.wait_histogram)
+            total = self.wait_total
+            timeouts = self.timeouts
+        
+        lines = [
+            '# TYPE sportsid_db_pool_checkout_wait_seconds histogram',
+            '# HELP sportsid_db_pool_checkout_wait_seconds Time spent waiting for a pooled database connection.'
+        ]
+        cumulative = 0
+        for bound, count in zip([repr(float(b)) for b in self.buckets] + ['+Inf'], counts):
+            cumulative += count
+            lines.append(f'sportsid_db_pool_checkout_wait_seconds_bucket{_labels(le=bound)} {cumulative}')
+        lines += [
+            f'sportsid_db_pool_checkout_wait_seconds_count {cumulative}',
+            f'sportsid_db_pool_checkout_wait_seconds_sum {total}',
+            '# TYPE sportsid_db_pool_checkout_timeouts counter',
+            '# HELP sportsid_db_pool_checkout_timeouts Checkouts that gave up waiting for a connection.',
+            f'sportsid_db_pool_checkout_timeouts_total {timeouts}'
+        ]
+        
+        for name, help_text in (('in_use', 'Connections checked out of the pool.'),
+                                ('idle', 'Connections idle in the pool.'),
+                                ('overflow', 'Connections open beyond the pool size.')):
+            lines += [f'# TYPE sportsid_db_pool_{name} gauge', f'# HELP sportsid_db_pool_{name} {help_text}']
+            for index, pool in enumerate(list(self.pools)):
+                value = {'in_use': pool.checkedout, 'idle': pool.checkedin,
+                         'overflow': lambda: max(pool.overflow(), 0)}[name]()
+                lines.append(f'sportsid_db_pool_{name}{_labels(pool=index)} {value}')
+        return lines
+
+# Global pool monitor
+pool_monitor = PoolMonitor(leak_threshold=float(os.environ.get('DB_POOL_LEAK_SECONDS', 5)))
+
+@event.listens_for(MonitoredQueuePool, 'checkout')
+def _pool_checkout(dbapi_connection, connection_record, connection_proxy):
+    pool_monitor.checkout(connection_record)
+
+@event.listens_for(MonitoredQueuePool, 'checkin')
+def _pool_checkin(dbapi_connection, connection_record):
+    pool_monitor.checkin(connection_record)
+
+class SingleFlight:
+    """Coalesce concurrent calls for the same key into a single execution"""
+    
+    class Call:
+        def __init__(self):
+            self.done = threading.Event()
+            self.result = None
+            self.error = None
+    
+    def __init__(self, wait_timeout=30):
+        self.calls = {}
+        self.wait_timeout = wait_timeout
+        self.coalesced = 0
+        self.lock = threading.Lock()
+    
+    def do(self, key, fn):
+        """Run fn for key, or wait for and share the result of a call already running"""
+        with self.lock:
+            call = self.calls.get(key)
+            leader = call is None
+            if leader:
+                call = self.calls[key] = self.Call()
+            else:
+                self.coalesced += 1
+        
+        if not leader:
+            # A leader stuck for too long must not stall its followers forever
+            if not call.done.wait(self.wait_timeout):
+                return fn()
+            if call.error is not None:
+                raise call.error
+            return call.result
+        
+        try:
+            call.result = fn()
+            return call.result
+        except BaseException as e:
+            call.error = e
+            raise
+        finally:
+            with self.lock:
+                del self.calls[key]
+            call.done.set()
+
+# Cached value plus the time it stops being fresh; it may still be served
+# stale (while a refresh runs) until the backend expires it
+CacheEntry = register_cache_type(namedtuple('CacheEntry', 'value fresh_until'))
 
 class CacheManager:
-    """Simple in-memory cache for frequently accessed data"""
+    """
+    Cache facade over a pluggable storage backend (see cache_backends.py)
+    Counts hits and misses, keeps tag versions, and treats backend failures
+    as misses so an unreachable shared cache never fails a request
+    """
     
-    def __init__(self, max_size=1000, ttl=300):  # 5 minutes TTL
-        self.cache = {}
-        self.max_size = max_size
+    def __init__(self, max_size=1000, ttl=300, max_bytes=64 * 1024 * 1024, sweep_interval=60, backend=None):
+        self.backend = backend or MemoryCacheBackend(max_size=max_size, max_bytes=max_bytes,
+                                                     sweep_interval=sweep_interval)
         self.ttl = ttl
+        self.flights = SingleFlight()
+        self.refreshing = set()
+        self.hits = 0
+        self.misses = 0
+        self.errors = 0
+        self.stale_hits = 0
+        self.background_refreshes = 0
         self.lock = threading.Lock()
     
+    def _count(self, counter):
+        with self.lock:
+            setattr(self, counter, getattr(self, counter) + 1)
+    
+    def _backend_error(self, operation, error):
+        self._count('errors')
+        logger.warning(f"Cache backend {self.backend.name} failed to {operation}: {error}")
+    
     def get(self, key):
         """Get value from cache"""
+        try:
+            value = self.backend.get(key)
+        except Exception as e:
+            self._backend_error('get', e)
+            value = None
+        self._count('misses' if value is None else 'hits')
+        return value
+    
+    def set(self, key, value, ttl=None):
+        """Set value in cache, optionally with its own TTL in seconds"""
+        try:
+            self.backend.set(key, value, self.ttl if ttl is None else ttl)
+        except Exception as e:
+            self._backend_error('set', e)
+    
+    def get_or_compute(self, key, compute, ttl=None, stale_ttl=0):
+        """
+        Return the cached value for key, computing it on a miss
+        compute() returns (value, cacheable). Concurrent misses for the same
+        key in this process share one compute() call. For stale_ttl seconds
+        after the TTL, the stale value is served while one background thread
+        recomputes it.
+        """
+        ttl = self.ttl if ttl is None else ttl
+        entry = self.get(key)
+        if isinstance(entry, CacheEntry):
+            if time.time() >= entry.fresh_until:
+                self._count('stale_hits')
+                self._refresh_in_background(key, compute, ttl, stale_ttl)
+            return entry.value
+        
+        return self.flights.do(key, lambda: self._compute_and_store(key, compute, ttl, stale_ttl))
+    
+    def _compute_and_store(self, key, compute, ttl, stale_ttl):
+        value, cacheable = compute()
+        if cacheable:
+            self.set(key, CacheEntry(value, time.time() + ttl), ttl + stale_ttl)
+        return value
+    
+    def _refresh_in_background(self, key, compute, ttl, stale_ttl):
         with self.lock:
-            if key in self.cache:
-                value, timestamp = self.cache[key]
-                if time.time() - timestamp < self.ttl:
-                    return value
-                else:
-                    del self.cache[key]
-            return None
+            if key in self.refreshing:
+                return
+            self.refreshing.add(key)
+            self.background_refreshes += 1
+        
+        def refresh():
+            try:
+                self.flights.do(key, lambda: self._compute_and_store(key, compute, ttl, stale_ttl))
+            except Exception as e:
+                logger.warning(f"Background refresh of {key} failed: {e}")
+            finally:
+                with self.lock:
+                    self.refreshing.discard(key)
+        
+        # Views read the request, so the refresh runs in a context built from it
+        if has_request_context():
+            refresh = isolated_request_context(refresh)
+        threading.Thread(target=refresh, daemon=True).start()
+    
+    def delete(self, key):
+        """Remove a single entry"""
+        try:
+            self.backend.delete(key)
+        except Exception as e:
+            self._backend_error('delete', e)
     
-    def set(self, key, value):
-        """Set value in cache"""
+    def sweep(self):
+        """Drop all expired entries now"""
+        self.backend.sweep()
+    
+    def get_stats(self):
+        """Hit/miss counters plus the backend's eviction and size figures"""
         with self.lock:
-            if len(self.cache) >= self.max_size:
-                # Remove oldest entry
-                oldest_key = min(self.cache.keys(), key=lambda k: self.cache[k][1])
-                del self.cache[oldest_key]
-            
-            self.cache[key] = (value, time.time())
+            lookups = self.hits + self.misses
+            stats = {
+                'backend': self.backend.name,
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_rate': self.hits / lookups if lookups else 0,
+                'errors': self.errors,
+                'stale_hits': self.stale_hits,
+                'background_refreshes': self.background_refreshes,
+                'coalesced_waits': self.flights.coalesced
+            }
+        try:
+            stats.update(self.backend.get_stats())
+        except Exception as e:
+            self._backend_error('report stats', e)
+        return stats
+    
+    def tag_version(self, tag):
+        """Current version of a tag; part of the key of every entry carrying it"""
+        try:
+            return self.backend.get_counter(f"tag:{tag}")
+        except Exception as e:
+            self._backend_error('read tag version', e)
+            return 0
+    
+    def invalidate_tag(self, tag):
+        """
+        Invalidate every entry carrying a tag in O(1)
+        Bumping the version changes the keys readers look up, so old entries
+        are never read again and age out on their own. Runs after the write
+        committed, so a backend failure is logged rather than failing it;
+        returns the new version, or None if the backend could not be reached
+        """
+        try:
+            return self.backend.incr(f"tag:{tag}")
+        except Exception as e:
+            self._backend_error('invalidate tag', e)
+            return None
+    
+    def tagged_key(self, key, tags):
+        """Append the current version of each tag to a cache key"""
+        if not tags:
+            return key
+        return key + ''.join(f"|{tag}:{self.tag_version(tag)}" for tag in sorted(tags))
     
     def clear(self):
         """Clear all cache entries"""
-        with self.lock:
-            self.cache.clear()
+        self.backend.clear()
+
+# Global cache instance; CACHE_BACKEND selects where entries live, e.g.
+# "memory" (per process), "shm" (shared by workers on a host) or "redis://host:6379/0"
+cache_manager = CacheManager(backend=create_cache_backend(
+    os.environ.get('CACHE_BACKEND', 'memory'),
+    max_size=int(os.environ.get('CACHE_MAX_ENTRIES', 10000)),
+    max_bytes=int(os.environ.get('CACHE_MAX_BYTES', 64 * 1024 * 1024))
+))
+
+def invalidate_tag(tag):
+    """Invalidate all cached results and snapshots tagged with tag"""
+    return cache_manager.invalidate_tag(tag)
+
+def tagged_ttl(ttl, local_ttl=60):
+    """
+    TTL for results kept fresh by tag invalidation
+    Tag versions only reach every worker through a shared backend; with the
+    per-process memory backend a write invalidates its own worker's entries,
+    so the others must expire theirs within local_ttl seconds
+    """
+    return ttl if cache_manager.backend.name != 'memory' else min(ttl, local_ttl)
+
+@register_cache_type
+class FrozenResponse(namedtuple('FrozenResponse', 'body status mimetype headers extra')):
+    """Plain-data copy of a view's response, so any cache backend can store it"""
+    
+    @classmethod
+    def freeze(cls, result):
+        """Convert a Response or (Response, status, ...) tuple; other values pass through"""
+        if isinstance(result, Response):
+            response, extra = result, None
+        elif isinstance(result, tuple) and result and isinstance(result[0], Response):
+            response, extra = result[0], result[1:]
+        else:
+            return result
+        headers = [(k, v) for k, v in response.headers.items() if k not in ('Content-Type', 'Content-Length')]
+        return cls(response.get_data(), response.status_code, response.mimetype, headers, extra)
+    
+    def thaw(self):
+        """Rebuild a fresh response object for the current request"""
+        response = current_app.response_class(self.body, status=self.status, mimetype=self.mimetype)
+        response.headers.extend(self.headers)
+        return response if self.extra is None else (response, *self.extra)
 
-# Global cache instance
-cache_manager = CacheManager()
+def make_cache_key(f, args, kwargs, vary_on_identity=False, vary_headers=()):
+    """
+    Stable, bounded cache key for a call
+    Inside a request the key covers the method, normalized path and sorted
+    query parameters, plus the JWT identity and selected headers when asked.
+    Parts are hashed with SHA-256 (not hash(), which is randomized per
+    process) so every worker derives the same key.
+    """
+    if has_request_context():
+        parts = [
+            request.method,
+            request.path.rstrip('/') or '/',
+            urlencode(sorted(request.args.items(multi=True)))
+        ]
+        if vary_on_identity:
+            verify_jwt_in_request(optional=True)
+            identity = get_jwt_identity()
+            parts.append(f"identity={identity if identity is not None else ''}")
+        for header in sorted(h.lower() for h in vary_headers):
+            parts.append(f"{header}={request.headers.get(header, '')}")
+    else:
+        parts = [repr(args), repr(sorted(kwargs.items()))]
+    
+    digest = hashlib.sha256('\n'.join(parts).encode()).hexdigest()[:32]
+    return f"{f.__module__}.{f.__name__}:{digest}"
 
-def cache_result(ttl=300):
-    """Decorator to cache function results"""
+def cache_result(ttl=300, tags=(), stale_ttl=0, vary_on_identity=False, vary_headers=()):
+    """
+    Decorator to cache function results
+    Results carrying tags are invalidated by invalidate_tag(), so write paths
+    keep them fresh and the TTL only bounds memory and cross-process staleness.
+    Concurrent misses run the function once; for stale_ttl seconds past the
+    TTL the old result is served while it is refreshed in the background.
+    Per-user views must pass vary_on_identity=True; see make_cache_key.
+    """
     def decorator(f):
         @wraps(f)
         def decorated_function(*args, **kwargs):
-            # Create cache key from function name and arguments
-            cache_key = f"{f.__name__}:{hash(str(args) + str(kwargs))}"
+            cache_key = make_cache_key(f, args, kwargs, vary_on_identity, vary_headers)
+            cache_key = cache_manager.tagged_key(cache_key, tags)
             
-            # Try to get from cache
-            cached_result = cache_manager.get(cache_key)
-            if cached_result is not None:
-                return cached_result
+            def compute():
+                # Execute function and cache result, unless the view failed
+                result = f(*args, **kwargs)
+                failed = isinstance(result, tuple) and len(result) > 1 and result[1] >= 500
+                return FrozenResponse.freeze(result), not failed
             
-            # Execute function and cache result
-            result = f(*args, **kwargs)
-            cache_manager.set(cache_key, result)
-            return result
+            result = cache_manager.get_or_compute(cache_key, compute, ttl, stale_ttl)
+            return result.thaw() if isinstance(result, FrozenResponse) else result
+        
+        return decorated_function
+    return decorator
+
+def versioned_snapshot(tag, ttl=300, stale_ttl=0):
+    """
+    Decorator serving a view from a pre-serialized snapshot of its JSON body
+    Snapshots are keyed by the tag's version and the request's query string,
+    carry a strong ETag and Last-Modified, and repeat requests whose
+    If-None-Match/If-Modified-Since still match get a 304 without calling the view
+    """
+    def decorator(f):
+        @wraps(f)
+        def decorated_function(*args, **kwargs):
+            snapshot_key = cache_manager.tagged_key(f"snapshot:{make_cache_key(f, args, kwargs)}", (tag,))
+            
+            def build_snapshot():
+                result = f(*args, **kwargs)
+                response, status = result if isinstance(result, tuple) else (result, 200)
+                if status != 200:
+                    return FrozenResponse.freeze(result), False
+                
+                body = response.get_data()
+                return {
+                    'body': body,
+                    'etag': hashlib.sha1(body).hexdigest(),
+                    'last_modified': datetime.utcnow().replace(microsecond=0),
+                    'headers': [(k, v) for k, v in response.headers.items() if k.startswith(('X-', 'Link'))]
+                }, True
+            
+            snapshot = cache_manager.get_or_compute(snapshot_key, build_snapshot, ttl, stale_ttl)
+            if isinstance(snapshot, FrozenResponse):
+                return snapshot.thaw()
+            
+            # If-None-Match takes precedence; If-Modified-Since only counts without it
+            if request.if_none_match:
+                not_modified = request.if_none_match.contains(snapshot['etag'])
+            else:
+                not_modified = bool(request.if_modified_since) and \
+                    request.if_modified_since.replace(tzinfo=None) >= snapshot['last_modified']
+            
+            if not_modified:
+                response = current_app.response_class(status=304)
+            else:
+                response = current_app.response_class(snapshot['body'], mimetype='application/json')
+                response.headers.extend(snapshot['headers'])
+            
+            response.set_etag(snapshot['etag'])
+            response.last_modified = snapshot['last_modified']
+            # Clients may keep the body but must revalidate, which is cheap
+            response.headers['Cache-Control'] = 'no-cache'
+            return response
         
         return decorated_function
     return decorator
 
+# Declarative rate-limit policies: `requests` per `period` seconds on average,
+# with bursts of up to `burst` requests
+RateLimitPolicy = namedtuple('RateLimitPolicy', 'requests period burst')
+
+RATE_LIMIT_POLICIES = {
+    'default': RateLimitPolicy(100, 60, 100),
+    # Login and signup: slow down credential stuffing and account spam
+    'auth': RateLimitPolicy(10, 60, 10),
+    # Sync fans out to every organization's API
+    'sync': RateLimitPolicy(10, 3600, 3),
+    # Cheap, cached catalog reads
+    'catalog': RateLimitPolicy(1200, 60, 200)
+}
+
 class RateLimiter:
-    """Simple rate limiter to prevent abuse"""
+    """
+    Token-bucket rate limiter with O(1) state and work per key
+    Keys are spread over lock stripes, each an LRU-ordered dict. A bucket
+    left idle long enough to refill is indistinguishable from a new one, so
+    idle buckets are dropped from the LRU end as calls come in, and each
+    stripe is capped so memory stays flat under scans from many addresses
+    """
     
-    def __init__(self, max_requests=100, time_window=60):  # 100 requests per minute
-        self.max_requests = max_requests
-        self.time_window = time_window
-        self.requests = {}
-        self.lock = threading.Lock()
+    class Stripe:
+        def __init__(self):
+            self.lock = threading.Lock()
+            self.buckets = OrderedDict()  # key -> [tokens, updated, full_at], least recently used first
+            self.allowed = 0
+            self.rejected = 0
+            self.evictions = 0
+    
+    def __init__(self, max_requests=100, time_window=60, stripes=16, max_keys=100000):
+        self.default_policy = RateLimitPolicy(max_requests, time_window, max_requests)
+        self.stripes = [self.Stripe() for _ in range(stripes)]
+        self.max_keys_per_stripe = max(max_keys // stripes, 1)
+    
+    def acquire(self, key, policy=None):
+        """Take a token for key; returns 0 if allowed, else the seconds until a token is available"""
+        policy = policy or self.default_policy
+        rate = policy.requests / policy.period
+        now = time.monotonic()
+        stripe = self.stripes[hash(key) % len(self.stripes)]
+        buckets = stripe.buckets
+        
+        with stripe.lock:
+            bucket = buckets.get(key)
+            if bucket is None:
+                tokens = policy.burst
+            else:
+                tokens = min(policy.burst, bucket[0] + (now - bucket[1]) * rate)
+                buckets.move_to_end(key)
+            
+            if tokens >= 1:
+                tokens -= 1
+                retry_after = 0
+                stripe.allowed += 1
+            else:
+                retry_after = (1 - tokens) / rate
+                stripe.rejected += 1
+            buckets[key] = [tokens, now, now + (policy.burst - tokens) / rate]
+            
+            while buckets:
+                oldest = next(iter(buckets.values()))
+                if oldest[2] <= now:
+                    # Refilled since its last use: dropping it loses nothing
+                    buckets.popitem(last=False)
+                elif len(buckets) > self.max_keys_per_stripe:
+                    buckets.popitem(last=False)
+                    stripe.evictions += 1
+                else:
+                    break
+        
+        return retry_after
     
     def is_allowed(self, client_ip):
         """Check if request is allowed for client IP"""
+        return self.acquire(client_ip) == 0
+    
+    def clear(self):
+        for stripe in self.stripes:
+            with stripe.lock:
+                stripe.buckets.clear()
+    
+    def get_stats(self):
+        return {
+            'keys': sum(len(stripe.buckets) for stripe in self.stripes),
+            'allowed': sum(stripe.allowed for stripe in self.stripes),
+            'rejected': sum(stripe.rejected for stripe in self.stripes),
+            'evictions': sum(stripe.evictions for stripe in self.stripes)
+        }
+
+class SharedRateLimiter:
+    """
+    Sliding-window-counter rate limiter over a shared counter store (see
+    cache_backends.py), so the limit holds across every worker and restart
+    Each key counts requests per fixed window with atomic increments; the
+    previous window's count, weighted by how much of it still overlaps the
+    sliding window, approximates a true sliding window in O(1) state.
+    Policies with burst < requests also get a short window of
+    burst / rate seconds holding at most burst requests, like a token
+    bucket's capacity. Only admitted requests stay counted, so a client
+    retrying while limited is not locked out for longer.
+    If the store is unreachable, the local limiter takes over
+    """
+    
+    def __init__(self, backend, fallback=None, prefix='ratelimit:'):
+        self.backend = backend
+        self.fallback = fallback or RateLimiter()
+        self.prefix = prefix
+        self.default_policy = self.fallback.default_policy
+        self.allowed = 0
+        self.rejected = 0
+        self.fallbacks = 0
+        self.lock = threading.Lock()
+    
+    def _count(self, counter):
+        with self.lock:
+            setattr(self, counter, getattr(self, counter) + 1)
+    
+    def _slide(self, name, limit, period, now):
+        """
+        Count a request in name's sliding window of period seconds
+        Returns (0, counter) if it fits within limit, else (seconds until it
+        would, None) with the request already taken back out of the count
+        """
+        window = int(now // period)
+        elapsed = now / period - window  # fraction of the current window gone by
+        counter = f"{name}:{window}"
+        # Counters outlive their window by one period, while they are still the "previous" window
+        current = self.backend.incr(counter, ttl=2 * period)
+        previous = self.backend.get_counter(f"{name}:{window - 1}")
+        estimate = previous * (1 - elapsed) + current
+        if estimate <= limit:
+            return 0, (counter, 2 * period)
+        
+        self.backend.incr(counter, ttl=2 * period, amount=-1)
+        # The estimate falls as the previous window slides out, or resets at the next window
+        until_next_window = (1 - elapsed) * period
+        if current > limit or not previous:
+            return until_next_window, None
+        return min(until_next_window, (estimate - limit) / previous * period), None
+    
+    def acquire(self, key, policy=None):
+        """Count a request for key; returns 0 if allowed, else the seconds until one would be"""
+        policy = policy or self.default_policy
         now = time.time()
+        windows = [(f"{self.prefix}{key}", policy.requests, policy.period)]
+        if policy.burst < policy.requests:
+            windows.append((f"{self.prefix}burst:{key}", policy.burst, policy.burst * policy.period / policy.requests))
+        
+        try:
+            admitted = []
+            for name, limit, period in windows:
+                retry_after, counted = self._slide(name, limit, period, now)
+                if retry_after:
+                    for counter, ttl in admitted:
+                        self.backend.incr(counter, ttl=ttl, amount=-1)
+                    break
+                admitted.append(counted)
+        except Exception as e:
+            self._count('fallbacks')
+            logger.warning(f"Rate limit store {self.backend.name} unavailable, limiting locally: {e}")
+            return self.fallback.acquire(key, policy)
         
+        self._count('rejected' if retry_after else 'allowed')
+        return retry_after
+    
+    def is_allowed(self, client_ip):
+        """Check if request is allowed for client IP"""
+        return self.acquire(client_ip) == 0
+    
+    def clear(self):
+        """Reset the local fallback; shared windows expire on their own"""
+        self.fallback.clear()
+    
+    def get_stats(self):
         with self.lock:
-            if client_ip not in self.requests:
-                self.requests[client_ip] = []
-            
-            # Remove old requests outside time window
-            self.requests[client_ip] = [
-                req_time for req_time in self.requests[client_ip]
-                if now - req_time < self.time_window
-            ]
-            
-            # Check if under limit
-            if len(self.requests[client_ip]) < self.max_requests:
-                self.requests[client_ip].append(now)
-                return True
-            else:
-                return False
+            stats = {
+                'backend': self.backend.name,
+                'allowed': self.allowed,
+                'rejected': self.rejected,
+                'fallbacks': self.fallbacks
+            }
+        stats['fallback'] = self.fallback.get_stats()
+        return stats
 
-# Global rate limiter
-rate_limiter = RateLimiter()
+def create_rate_limiter(url=None):
+    """Local token buckets for "memory" (default), shared windows for "shm" or "redis://" stores"""
+    if not url or url == 'memory':
+        return RateLimiter()
+    return SharedRateLimiter(create_cache_backend(url))
 
-def rate_limit(f):
-    """Decorator to apply rate limiting"""
-    @wraps(f)
-    def decorated_function(*args, **kwargs):
-        client_ip = request.remote_addr
-        
-        if not rate_limiter.is_allowed(client_ip):
-            return {
-                'error': 'Rate limit exceeded',
-                'retry_after': 60
-            }, 429
+# Global rate limiter; set RATE_LIMIT_BACKEND to shm or redis:// to share limits between workers
+rate_limiter = create_rate_limiter(os.environ.get('RATE_LIMIT_BACKEND', 'memory'))
+
+def rate_limit(policy='default'):
+    """
+    Decorator to apply a named rate-limit policy per client address
+    Usable bare (@rate_limit) for the default policy or as @rate_limit('auth')
+    """
+    if callable(policy):
+        return rate_limit()(policy)
+    limits = RATE_LIMIT_POLICIES[policy]
+    
+    def decorator(f):
+        @wraps(f)
+        def decorated_function(*args, **kwargs):
+            retry_after = rate_limiter.acquire(f"{policy}:{request.remote_addr}", limits)
+            if retry_after:
+                retry_after = math.ceil(retry_after)
+                response = jsonify({'error': 'Rate limit exceeded', 'retry_after': retry_after})
+                return response, 429, {'Retry-After': str(retry_after)}
+            
+            return f(*args, **kwargs)
         
-        return f(*args, **kwargs)
+        return decorated_function
     
-    return decorated_function
+    return decorator
 
 def get_performance_report():
     """Get comprehensive performance report"""
-    return performance_monitor.check_performance_thresholds()
+    report = performance_monitor.check_performance_thresholds()
+    report['latency'] = performance_monitor.get_latency_report()
+    report['database'] = performance_monitor.get_database_report()
+    report['cache'] = cache_manager.get_stats()
+    report['rate_limits'] = rate_limiter.get_stats()
+    report['db_pool'] = pool_monitor.get_stats()
+    return report
+
+def render_metrics():
+    """All metrics as an OpenMetrics text exposition"""
+    lines = request_metrics.render() + pool_monitor.render()
+    
+    stats = cache_manager.get_stats()
+    for name, help_text in (('hits', 'Cache lookups that found an entry.'),
+                            ('misses', 'Cache lookups that found nothing.')):
+        lines += [
+            f'# TYPE sportsid_cache_{name} counter',
+            f'# HELP sportsid_cache_{name} {help_text}',
+            f'sportsid_cache_{name}_total{_labels(backend=stats["backend"])} {stats[name]}'
+        ]
+    
+    lines.append('# EOF')
+    return '\n'.join(lines) + '\n'
+
@@ -0,0 +1,252 @@
+"""
+Read/write splitting between the primary database and a read replica
+Views marked with @read_only send their SELECTs to the replica bind unless
+the replica is down or lagging, or the client wrote to the primary within the
+last few seconds (read-your-writes). Everything else uses the primary.
+"""
+
+import threading
+import time
+import logging
+from functools import wraps
+from flask import request, has_request_context
+from flask_jwt_extended import get_jwt_identity
+from flask_sqlalchemy.session import Session
+from sqlalchemy import event, text
+from sqlalchemy.engine import Engine
+from sqlalchemy.exc import OperationalError
+from sqlalchemy.sql.elements import TextClause
+from performance import cache_manager
+
+logger = logging.getLogger(__name__)
+
+REPLICA_BIND = 'replica'
+
+# WSGI environ keys: the replica engine chosen for the current request, and
+# set once a statement on it failed
+REPLICA_ENGINE_KEY = 'sportsid.replica_engine'
+REPLICA_FAILED_KEY = 'sportsid.replica_failed'
+
+# Seconds the replica is behind the primary; NULL when it is not a streaming
+# replica at all (e.g. a second database used for testing)
+POSTGRES_LAG_QUERY = text(
+    "SELECT CASE WHEN pg_last_wal_receive_lsn() = pg_last_wal_replay_lsn() THEN 0 "
+    "ELSE EXTRACT(EPOCH FROM now() - pg_last_xact_replay_timestamp()) END"
+)
+
+class ReplicaRouter:
+    """Chooses between the replica and the primary for read-only requests"""
+
+    def __init__(self, max_lag=5.0, check_interval=5.0, sticky_seconds=5.0):
+        self.engine = None
+        self.db = None
+        self.max_lag = max_lag
+        self.check_interval = check_interval
+        self.sticky_seconds = sticky_seconds
+        self.healthy = False
+        self.lag = None
+        self.last_error = None
+        self.checked_at = 0.0
+        self.replica_reads = 0
+        self.primary_fallbacks = 0
+        self.sticky_reads = 0
+        self.replica_errors = 0
+        self.checking = threading.Lock()
+        self.lock = threading.Lock()
+
+    def init_app(self, app, db):
+        """
+        Use the app's replica bind, if SQLALCHEMY_BINDS configures one
+        Read-your-writes markers must reach every worker, so a replica needs
+        a shared cache backend
+        """
+        if (app.config.get('SQLALCHEMY_BINDS') or {}).get(REPLICA_BIND) and cache_manager.backend.name == 'memory':
+            raise RuntimeError("A read replica needs CACHE_BACKEND=shm (one host) or redis://... (several hosts) "
+                               "so every worker sees the read-your-writes markers")
+        self.db = db
+        self.max_lag = app.config.get('REPLICA_MAX_LAG_SECONDS', self.max_lag)
+        self.check_interval = app.config.get('REPLICA_CHECK_INTERVAL', self.check_interval)
+        self.sticky_seconds = app.config.get('READ_YOUR_WRITES_SECONDS', self.sticky_seconds)
+        with app.app_context():
+            self.engine = db.engines.get(REPLICA_BIND)
+        self.checked_at = 0.0
+
+    def check(self):
+        """Probe the replica and record whether it is reachable and within max_lag"""
+        try:
+            with self.engine.connect() as connection:
+                if connection.dialect.name == 'postgresql':
+                    lag = float(connection.execute(POSTGRES_LAG_QUERY).scalar() or 0)
+                else:
+                    connection.execute(text('SELECT 1'))
+                    lag = 0.0
+            healthy, error = lag <= self.max_lag, None
+        except Exception as e:
+            lag, healthy, error = None, False, str(e)
+
+        if healthy != self.healthy:
+            logger.warning(f"Read replica {'healthy' if healthy else 'unavailable'} "
+                           f"(lag {lag}s{', ' + error if error else ''})")
+        self.healthy, self.lag, self.last_error = healthy, lag, error
+        self.checked_at = time.monotonic()
+
+    def mark_failed(self, error):
+        """Stop using the replica until the next check finds it healthy"""
+        logger.warning(f"Read replica query failed, using the primary: {error}")
+        with self.lock:
+            self.replica_errors += 1
+        self.healthy, self.last_error = False, str(error)
+        self.checked_at = time.monotonic()
+
+    def available(self):
+        """Whether the replica may serve reads; one caller re-checks it per interval"""
+        if time.monotonic() - self.checked_at >= self.check_interval and self.checking.acquire(blocking=False):
+            try:
+                self.check()
+            finally:
+                self.checking.release()
+        return self.healthy
+
+    def _client_keys(self):
+        keys = [f"replica:wrote:addr:{request.remote_addr}"]
+        try:
+            identity = get_jwt_identity()
+        except RuntimeError:
+            identity = None
+        if identity is not None:
+            keys.append(f"replica:wrote:user:{identity}")
+        return keys
+
+    def mark_write(self):
+        """Pin the current client, and shared cached views, to the primary for sticky_seconds"""
+        if not has_request_context() or self.engine is None:
+            return
+        try:
+            for key in self._client_keys() + ['replica:wrote:any']:
+                cache_manager.backend.set(key, True, self.sticky_seconds)
+        except Exception as e:
+            logger.warning(f"Could not record write for read-your-writes: {e}")
+
+    def _wrote_recently(self, keys):
+        try:
+            return any(cache_manager.backend.get(key) for key in keys)
+        except Exception:
+            # Without the marker we cannot promise read-your-writes
+            return True
+
+    def choose(self, cached=False):
+        """
+        The replica engine for this request, or None for the primary
+        Views whose results land in a shared cache avoid the replica after
+        anyone's write, so a stale result is never cached for everyone
+        """
+        if self.engine is None:
+            return None
+        keys = ['replica:wrote:any'] if cached else self._client_keys()
+        if self._wrote_recently(keys):
+            counter = 'sticky_reads'
+        elif not self.available():
+            counter = 'primary_fallbacks'
+        else:
+            counter = 'replica_reads'
+        with self.lock:
+            setattr(self, counter, getattr(self, counter) + 1)
+        return self.engine if counter == 'replica_reads' else None
+
+    def get_stats(self):
+        with self.lock:
+            return {
+                'configured': self.engine is not None,
+                'healthy': self.healthy,
+                'lag_seconds': self.lag,
+                'max_lag_seconds': self.max_lag,
+                'last_error': self.last_error,
+                'replica_reads': self.replica_reads,
+                'primary_fallbacks': self.primary_fallbacks,
+                'sticky_reads': self.sticky_reads,
+                'replica_errors': self.replica_errors
+            }
+
+# Global replica router
+replica_router = ReplicaRouter()
+
+class RoutingSession(Session):
+    """
+    Session sending the reads of read-only requests to the replica chosen for them
+    Reads are SELECTs and text() statements, so e.g. a set_config() ahead of
+    a query lands on the same connection as the query it configures
+    """
+
+    def get_bind(self, mapper=None, clause=None, bind=None, **kwargs):
+        engine = super().get_bind(mapper=mapper, clause=clause, bind=bind, **kwargs)
+        if bind is not None or self._flushing or not has_request_context():
+            return engine
+        replica = request.environ.get(REPLICA_ENGINE_KEY)
+        if replica is None or engine is not self._db.engines.get(None):
+            return engine
+        if getattr(clause, 'is_select', False) or isinstance(clause, TextClause):
+            return replica
+        return engine
+
+@event.listens_for(Engine, 'handle_error')
+def _statement_failed(context):
+    # Views turn exceptions into 500 responses, so read_only learns of replica failures here
+    if isinstance(context.sqlalchemy_exception, OperationalError) and has_request_context():
+        environ = request.environ
+        if context.engine is not None and context.engine is environ.get(REPLICA_ENGINE_KEY):
+            environ[REPLICA_FAILED_KEY] = context.sqlalchemy_exception
+
+@event.listens_for(RoutingSession, 'after_flush')
+def _flushed(session, flush_context):
+    session.info['wrote'] = True
+
+@event.listens_for(RoutingSession, 'do_orm_execute')
+def _executed(orm_execute_state):
+    if orm_execute_state.is_insert or orm_execute_state.is_update or orm_execute_state.is_delete:
+        orm_execute_state.session.info['wrote'] = True
+
+@event.listens_for(RoutingSession, 'after_commit')
+def _committed(session):
+    if session.info.pop('wrote', False):
+        replica_router.mark_write()
+
+@event.listens_for(RoutingSession, 'after_rollback')
+def _rolled_back(session):
+    session.info.pop('wrote', None)
+
+def read_only(cached=False):
+    """
+    Decorator letting a view's queries run on the read replica
+    Usable bare (@read_only) or as @read_only(cached=True) for views whose
+    results are stored in a cache shared between users. If a statement
+    fails on the replica, the view runs again on the primary.
+    """
+    if callable(cached):
+        return read_only()(cached)
+
+    def decorator(f):
+        @wraps(f)
+        def decorated_function(*args, **kwargs):
+            engine = replica_router.choose(cached)
+            if engine is None:
+                return f(*args, **kwargs)
+
+            environ = request.environ
+            environ[REPLICA_ENGINE_KEY] = engine
+            try:
+                result = f(*args, **kwargs)
+            except OperationalError:
+                if REPLICA_FAILED_KEY not in environ:
+                    raise
+            error = environ.pop(REPLICA_FAILED_KEY, None)
+            if error is None:
+                return result
+
+            replica_router.mark_failed(error)
+            del environ[REPLICA_ENGINE_KEY]
+            replica_router.db.session.rollback()
+            return f(*args, **kwargs)
+
+        return decorated_function
+
+    return decorator
@@ -9,6 +9,29 @@ import sys
 import psycopg2
 from psycopg2.extensions import ISOLATION_LEVEL_AUTOCOMMIT
 
+# Statements that bring an existing database up to date with the models.
+# db.create_all() only creates missing tables, never new columns or indexes.
+SCHEMA_UPGRADES = [
+    # Keyset-paginated catalog listing
+    "CREATE INDEX IF NOT EXISTS ix_programs_name_id ON programs (name, id)",
+    "CREATE INDEX IF NOT EXISTS ix_programs_active_id ON programs (is_active, id)",
+    "CREATE INDEX IF NOT EXISTS ix_programs_sport_type_id ON programs (sport_type, id)",
+    "CREATE INDEX IF NOT EXISTS ix_programs_organization_id ON programs (organization, id)",
+    "CREATE INDEX IF NOT EXISTS ix_programs_price_id ON programs (price, id)",
+    # Numeric age range parsed from age_range
+    "ALTER TABLE programs ADD COLUMN IF NOT EXISTS min_age INTEGER",
+    "ALTER TABLE programs ADD COLUMN IF NOT EXISTS max_age INTEGER",
+    "CREATE INDEX IF NOT EXISTS ix_programs_age ON programs (min_age, max_age)",
+    # Offline geocoding and radius search
+    "ALTER TABLE programs ADD COLUMN IF NOT EXISTS zip_code VARCHAR(10)",
+    "ALTER TABLE programs ADD COLUMN IF NOT EXISTS latitude DOUBLE PRECISION",
+    "ALTER TABLE programs ADD COLUMN IF NOT EXISTS longitude DOUBLE PRECISION",
+    "ALTER TABLE programs ADD COLUMN IF NOT EXISTS geo_cell INTEGER",
+    "CREATE INDEX IF NOT EXISTS ix_programs_geo_cell ON programs (geo_cell)",
+    "ALTER TABLE families ADD COLUMN IF NOT EXISTS latitude DOUBLE PRECISION",
+    "ALTER TABLE families ADD COLUMN IF NOT EXISTS longitude DOUBLE PRECISION",
+]
+
 def create_database():
     """Create PostgreSQL database and user for SportsID"""
     
@@ -100,6 +123,34 @@ def create_tables():
         print(f"❌ Failed to create tables: {e}")
         return False
 
+def upgrade_schema():
+    """Apply columns and indexes added after the tables were first created"""
+    try:
+        from sqlalchemy import text
+        from app import (app, db, PROGRAM_TRGM_INDEXES, backfill_program_ages, geocode_locations,
+                         rebuild_program_facets)
+        
+        with app.app_context():
+            print("Upgrading application schema...")
+            with db.engine.begin() as conn:
+                for statement in SCHEMA_UPGRADES + PROGRAM_TRGM_INDEXES:
+                    conn.execute(text(statement))
+            
+            print("Backfilling program age ranges...")
+            print(f"   {backfill_program_ages()} programs updated")
+            
+            print("Geocoding programs and families...")
+            print(f"   {geocode_locations()} records geocoded")
+            
+            print("Rebuilding program facet counts...")
+            print(f"   {rebuild_program_facets()} facet combinations")
+            print("✅ Application schema is up to date")
+            return True
+            
+    except Exception as e:
+        print(f"❌ Failed to upgrade schema: {e}")
+        return False
+
 def main():
     """Main setup function"""
     print("🚀 Setting up PostgreSQL database for SportsID...")
@@ -118,6 +169,10 @@ def main():
         print("❌ Table creation failed. Exiting.")
         sys.exit(1)
     
+    if not upgrade_schema():
+        print("❌ Schema upgrade failed. Exiting.")
+        sys.exit(1)
+    
     print("\n" + "=" * 50)
     print("🎉 Database setup completed successfully!")
     print("\nNext steps:")
@@ -1,7 +1,156 @@
 import requests
 import json
-from datetime import datetime
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+from contextvars import copy_context
+from datetime import datetime, timedelta, timezone
+from email.utils import parsedate_to_datetime
 from typing import List, Dict, Optional
+from requests.adapters import HTTPAdapter
+from urllib3.exceptions import MaxRetryError, ResponseError
+from urllib3.util.retry import Retry
+from performance import span
+
+# Organizations fetched at once during a sync, and the seconds each one gets
+SYNC_MAX_WORKERS = int(os.environ.get('SYNC_MAX_WORKERS', 8))
+SYNC_ORG_DEADLINE = float(os.environ.get('SYNC_ORG_DEADLINE', 30))
+# Delta syncs re-read this much before the previous response, since upserts
+# are idempotent and changes committed while it was built must not be missed
+SYNC_CURSOR_OVERLAP = timedelta(seconds=60)
+
+# Organization API connections: (connect, read) timeouts in seconds, keep-alive
+# connections kept per organization, and retries of failed idempotent requests
+UPSTREAM_CONNECT_TIMEOUT = float(os.environ.get('UPSTREAM_CONNECT_TIMEOUT', 3.05))
+UPSTREAM_READ_TIMEOUT = float(os.environ.get('UPSTREAM_READ_TIMEOUT', 30))
+UPSTREAM_POOL_SIZE = int(os.environ.get('UPSTREAM_POOL_SIZE', 10))
+UPSTREAM_RETRIES = int(os.environ.get('UPSTREAM_RETRIES', 3))
+UPSTREAM_MAX_RETRY_WAIT = float(os.environ.get('UPSTREAM_MAX_RETRY_WAIT', 10))
+
+class BoundedRetry(Retry):
+    """
+    Retry that spends at most max_wait seconds sleeping between attempts
+    A Retry-After longer than what is left of that budget is not honoured:
+    the response is returned instead of blocking the calling thread
+    """
+    
+    def __init__(self, *args, max_wait=UPSTREAM_MAX_RETRY_WAIT, started_at=None, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.max_wait = max_wait
+        self.started_at = started_at
+    
+    def new(self, **kw):
+        # Each request's retries start from the shared template; its clock starts at the first failure
+        kw.setdefault('max_wait', self.max_wait)
+        kw.setdefault('started_at', self.started_at if self.started_at is not None else time.monotonic())
+        return super().new(**kw)
+    
+    def remaining(self) -> float:
+        if self.started_at is None:
+            return self.max_wait
+        return self.max_wait - (time.monotonic() - self.started_at)
+    
+    def increment(self, method=None, url=None, response=None, error=None, _pool=None, _stacktrace=None):
+        retry = super().increment(method, url, response, error, _pool, _stacktrace)
+        retry_after = None
+        if response is not None and retry.respect_retry_after_header:
+            retry_after = retry.get_retry_after(response)
+        if retry.remaining() <= 0 or (retry_after is not None and retry_after > retry.remaining()):
+            reason = error or ResponseError(ResponseError.SPECIFIC_ERROR.format(status_code=response.status))
+            raise MaxRetryError(_pool, url, reason) from reason
+        return retry
+    
+    def sleep(self, response=None):
+        wait = None
+        if self.respect_retry_after_header and response is not None:
+            wait = self.get_retry_after(response)
+        if wait is None:
+            wait = self.get_backoff_time()
+        wait = min(wait, self.remaining())
+        if wait > 0:
+            time.sleep(wait)
+
+class UpstreamClient:
+    """
+    Process-wide HTTP client for organization APIs
+    Each organization gets its own session and keep-alive connection pool, so
+    repeat calls skip TCP and TLS setup. Connection errors and 429/5xx responses
+    to idempotent requests are retried with jittered exponential backoff,
+    honouring Retry-After, for at most max_retry_wait seconds of waiting.
+    """
+    
+    def __init__(self, pool_size=UPSTREAM_POOL_SIZE, retries=UPSTREAM_RETRIES, backoff_factor=0.5,
+                 backoff_jitter=0.5, max_retry_wait=UPSTREAM_MAX_RETRY_WAIT,
+                 timeout=(UPSTREAM_CONNECT_TIMEOUT, UPSTREAM_READ_TIMEOUT)):
+        self.pool_size = pool_size
+        self.retry = BoundedRetry(
+            total=retries,
+            max_wait=max_retry_wait,
+            backoff_factor=backoff_factor,
+            backoff_jitter=backoff_jitter,
+            status_forcelist=(429, 500, 502, 503, 504),
+            allowed_methods=frozenset({'GET', 'HEAD', 'OPTIONS'}),
+            respect_retry_after_header=True,
+            raise_on_status=False
+        )
+        self.timeout = timeout
+        self.sessions = {}
+        self.lock = threading.Lock()
+    
+    def session(self, org_name: str) -> requests.Session:
+        """The organization's pooled session, created on first use"""
+        session = self.sessions.get(org_name)
+        if session is None:
+            with self.lock:
+                session = self.sessions.get(org_name)
+                if session is None:
+                    session = requests.Session()
+                    adapter = HTTPAdapter(pool_connections=1, pool_maxsize=self.pool_size, max_retries=self.retry)
+                    session.mount('http://', adapter)
+                    session.mount('https://', adapter)
+                    self.sessions[org_name] = session
+        return session
+    
+    def get(self, org_name: str, url: str, timeout=None, **kwargs) -> requests.Response:
+        return self.session(org_name).get(url, timeout=timeout or self.timeout, **kwargs)
+    
+    def get_stats(self) -> Dict:
+        """Requests and newly opened connections per organization, and how often a connection was reused"""
+        organizations = {}
+        with self.lock:
+            sessions = list(self.sessions.items())
+        for org_name, session in sessions:
+            pools = session.get_adapter('https://').poolmanager.pools
+            requests_sent = connections = 0
+            for key in pools.keys():
+                pool = pools.get(key)
+                if pool is not None:
+                    requests_sent += pool.num_requests
+                    connections += pool.num_connections
+            organizations[org_name] = {
+                'requests': requests_sent,
+                'connections_opened': connections,
+                'reuse_rate': 1 - connections / requests_sent if requests_sent else 0
+            }
+        
+        requests_sent = sum(org['requests'] for org in organizations.values())
+        connections = sum(org['connections_opened'] for org in organizations.values())
+        return {
+            'organizations': organizations,
+            'requests': requests_sent,
+            'connections_opened': connections,
+            'reuse_rate': 1 - connections / requests_sent if requests_sent else 0
+        }
+    
+    def close(self):
+        with self.lock:
+            sessions, self.sessions = self.sessions, {}
+        for session in sessions.values():
+            session.close()
+
+# Global upstream client shared by every SportsAPIIntegration
+upstream_client = UpstreamClient()
 
 class SportsAPIIntegration:
     """
@@ -9,11 +158,13 @@ class SportsAPIIntegration:
     Supports multiple sports organizations and their APIs
     """
     
-    def __init__(self):
+    def __init__(self, client: Optional[UpstreamClient] = None):
+        self.client = client or upstream_client
         self.api_configs = {
             'youth_sports_league': {
                 'base_url': 'https://api.youthsportsleague.com/v1',
                 'api_key': 'your-api-key-here',
+                'delta_param': 'updated_since',  # Query parameter asking for programs changed since a time
                 'headers': {
                     'Authorization': 'Bearer your-api-key-here',
                     'Content-Type': 'application/json'
@@ -22,6 +173,7 @@ class SportsAPIIntegration:
             'community_rec_center': {
                 'base_url': 'https://api.communityrec.com/v2',
                 'api_key': 'your-api-key-here',
+                'delta_param': 'modified_since',
                 'headers': {
                     'X-API-Key': 'your-api-key-here',
                     'Content-Type': 'application/json'
@@ -34,28 +186,7 @@ class SportsAPIIntegration:
         Fetch programs from a specific sports organization
         """
         try:
-            config = self.api_configs.get(org_name)
-            if not config:
-                raise ValueError(f"Unknown organization: {org_name}")
-            
-            # Build URL with filters
-            url = f"{config['base_url']}/programs"
-            params = filters or {}
-            
-            response = requests.get(
-                url,
-                headers=config['headers'],
-                params=params,
-                timeout=30
-            )
-            
-            if response.status_code == 200:
-                data = response.json()
-                return self._normalize_program_data(data, org_name)
-            else:
-                print(f"API Error for {org_name}: {response.status_code}")
-                return []
-                
+            return self.fetch_program_changes(org_name, filters=filters)['programs']
         except requests.RequestException as e:
             print(f"Request failed for {org_name}: {str(e)}")
             return []
@@ -63,6 +194,66 @@ class SportsAPIIntegration:
             print(f"Error fetching from {org_name}: {str(e)}")
             return []
     
+    def fetch_program_changes(self, org_name: str, state: Optional[Dict] = None, filters: Optional[Dict] = None,
+                              timeout=None) -> Dict:
+        """
+        Fetch an organization's programs changed since a previous sync, raising on any failure
+        state is the 'state' returned by the previous call: its ETag and
+        Last-Modified make the request conditional, and its cursor is sent as
+        the organization's delta parameter. A 304 returns no programs and the
+        same state.
+        """
+        config = self.api_configs.get(org_name)
+        if not config:
+            raise ValueError(f"Unknown organization: {org_name}")
+        state = state or {}
+        
+        # Build URL with filters
+        url = f"{config['base_url']}/programs"
+        params = dict(filters or {})
+        if state.get('cursor') and config.get('delta_param'):
+            params[config['delta_param']] = state['cursor']
+        
+        headers = dict(config['headers'])
+        if state.get('etag'):
+            headers['If-None-Match'] = state['etag']
+        if state.get('last_modified'):
+            headers['If-Modified-Since'] = state['last_modified']
+        
+        with span('http', method='GET', url=url, organization=org_name) as http_span:
+            response = self.client.get(
+                org_name,
+                url,
+                headers=headers,
+                params=params,
+                timeout=timeout
+            )
+            http_span['status'] = response.status_code
+        
+        if response.status_code == 304:
+            return {'programs': [], 'not_modified': True, 'state': state}
+        if response.status_code != 200:
+            raise requests.HTTPError(f"API Error for {org_name}: {response.status_code}", response=response)
+        
+        data = response.json()
+        return {
+            'programs': self._normalize_program_data(data, org_name),
+            'not_modified': False,
+            'state': {
+                'etag': response.headers.get('ETag'),
+                'last_modified': response.headers.get('Last-Modified'),
+                # The upstream's clock, so skew between the servers cannot skip changes
+                'cursor': (self._server_time(response) - SYNC_CURSOR_OVERLAP).isoformat()
+            }
+        }
+    
+    @staticmethod
+    def _server_time(response) -> datetime:
+        try:
+            return parsedate_to_datetime(response.headers['Date']).astimezone(timezone.utc).replace(tzinfo=None)
+        except (KeyError, TypeError, ValueError):
+            return datetime.utcnow()
+    
     def _normalize_program_data(self, data: Dict, org_name: str) -> List[Dict]:
         """
         Normalize program data from different organizations into a standard format
@@ -105,19 +296,81 @@ class SportsAPIIntegration:
         
         return programs
     
-    def sync_all_organizations(self) -> Dict[str, List[Dict]]:
+    def sync_all_organizations(self, max_workers: Optional[int] = None, deadline: Optional[float] = None,
+                               states: Optional[Dict[str, Dict]] = None) -> Dict:
         """
-        Sync programs from all configured organizations
+        Sync programs from all configured organizations concurrently
+        At most max_workers organizations are fetched at once, and each gets
+        deadline seconds from the moment its fetch starts. Organizations that
+        fail or run out of time are reported rather than failing the sync, so
+        a run takes about as long as the slowest organization that finishes.
+        states maps organizations to the state saved from the previous sync;
+        only changed programs are returned, and 'states' holds the new ones.
         """
-        all_programs = {}
+        max_workers = max_workers or SYNC_MAX_WORKERS
+        deadline = deadline or SYNC_ORG_DEADLINE
+        states = states or {}
+        start = time.monotonic()
+        started = {}
         
-        for org_name in self.api_configs.keys():
+        def fetch(org_name):
+            started[org_name] = time.monotonic()
             print(f"Syncing programs from {org_name}...")
-            programs = self.fetch_programs_from_organization(org_name)
-            all_programs[org_name] = programs
-            print(f"Found {len(programs)} programs from {org_name}")
+            return self.fetch_program_changes(org_name, state=states.get(org_name),
+                                              timeout=(UPSTREAM_CONNECT_TIMEOUT, deadline))
+        
+        executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='sync')
+        # Each fetch runs in a copy of the caller's context so its spans join the request trace
+        pending = {executor.submit(copy_context().run, fetch, org_name): org_name for org_name in self.api_configs}
+        all_programs = {}
+        new_states = {}
+        report = {}
         
-        return all_programs
+        try:
+            while pending:
+                done, _ = wait(pending, timeout=self._next_deadline(pending, started, deadline),
+                               return_when=FIRST_COMPLETED)
+                now = time.monotonic()
+                
+                for future in done:
+                    org_name = pending.pop(future)
+                    elapsed = round(now - started.get(org_name, now), 3)
+                    try:
+                        changes = future.result()
+                    except Exception as e:
+                        print(f"Sync failed for {org_name}: {str(e)}")
+                        report[org_name] = {'status': 'error', 'error': str(e), 'elapsed': elapsed}
+                        continue
+                    programs = changes['programs']
+                    all_programs[org_name] = programs
+                    new_states[org_name] = changes['state']
+                    report[org_name] = {'status': 'ok', 'programs': len(programs),
+                                        'not_modified': changes['not_modified'], 'elapsed': elapsed}
+                    print(f"Found {len(programs)} changed programs from {org_name}")
+                
+                for future, org_name in list(pending.items()):
+                    if org_name in started and now - started[org_name] >= deadline:
+                        # The worker gives up on its own once its socket times out
+                        del pending[future]
+                        print(f"Sync of {org_name} exceeded its {deadline}s deadline")
+                        report[org_name] = {'status': 'timeout', 'elapsed': round(now - started[org_name], 3)}
+        finally:
+            executor.shutdown(wait=False, cancel_futures=True)
+        
+        return {
+            'programs': all_programs,
+            'states': new_states,
+            'organizations': report,
+            'complete': all(org['status'] == 'ok' for org in report.values()),
+            'elapsed': round(time.monotonic() - start, 3)
+        }
+    
+    @staticmethod
+    def _next_deadline(pending, started, deadline):
+        """Seconds until the earliest running fetch runs out of time"""
+        now = time.monotonic()
+        remaining = [started[org_name] + deadline - now for org_name in pending.values() if org_name in started]
+        return max(min(remaining, default=deadline), 0)
     
     def get_program_details(self, org_name: str, program_id: str) -> Optional[Dict]:
         """
@@ -129,11 +382,13 @@ class SportsAPIIntegration:
                 return None
             
             url = f"{config['base_url']}/programs/{program_id}"
-            response = requests.get(
-                url,
-                headers=config['headers'],
-                timeout=30
-            )
+            with span('http', method='GET', url=url, organization=org_name) as http_span:
+                response = self.client.get(
+                    org_name,
+                    url,
+                    headers=config['headers']
+                )
+                http_span['status'] = response.status_code
             
             if response.status_code == 200:
                 return response.json()
@@ -154,11 +409,13 @@ class SportsAPIIntegration:
                 return {'available': False, 'error': 'Unknown organization'}
             
             url = f"{config['base_url']}/programs/{program_id}/availability"
-            response = requests.get(
-                url,
-                headers=config['headers'],
-                timeout=30
-            )
+            with span('http', method='GET', url=url, organization=org_name) as http_span:
+                response = self.client.get(
+                    org_name,
+                    url,
+                    headers=config['headers']
+                )
+                http_span['status'] = response.status_code
             
             if response.status_code == 200:
                 data = response.json()
@@ -1,4 +1,4 @@
-import { useEffect, useState } from 'react';
+import { useCallback, useEffect, useRef, useState } from 'react';
 import { Link } from 'react-router-dom';
 
 interface Program {
@@ -12,38 +12,127 @@ interface Program {
   organization?: string;
 }
 
+interface Facets {
+  sport_type: Record<string, number>;
+  organization: Record<string, number>;
+  price_bucket: Record<string, number>;
+  age_band: Record<string, number>;
+}
+
+// Results returned by /api/programs/search; the search is ranked, not paginated
+const SEARCH_LIMIT = 100;
+const SEARCH_DEBOUNCE_MS = 300;
+
 export default function Programs() {
   const [programs, setPrograms] = useState<Program[]>([]);
   const [loading, setLoading] = useState(true);
   const [selectedSport, setSelectedSport] = useState<string>('all');
   const [selectedAge, setSelectedAge] = useState<string>('all');
   const [searchTerm, setSearchTerm] = useState('');
+  const [query, setQuery] = useState('');
+  const [nextCursor, setNextCursor] = useState<string | null>(null);
+  const [loadingMore, setLoadingMore] = useState(false);
+
+  const [facets, setFacets] = useState<Facets | null>(null);
 
+  // Bumped whenever the filters change; responses for an older generation are ignored
+  const generation = useRef(0);
+
+  // Search on the server once typing pauses, rather than on every keystroke
   useEffect(() => {
-    fetch('http://localhost:5000/api/programs')
-      .then((res) => res.json())
-      .then((data) => {
-        setPrograms(data);
-        setLoading(false);
+    const timer = setTimeout(() => setQuery(searchTerm.trim()), SEARCH_DEBOUNCE_MS);
+    return () => clearTimeout(timer);
+  }, [searchTerm]);
+
+  const filterParams = useCallback(() => {
+    const params = new URLSearchParams();
+    if (selectedSport !== 'all') params.set('sport_type', selectedSport);
+    if (selectedAge !== 'all') params.set('age_band', selectedAge);
+    return params;
+  }, [selectedSport, selectedAge]);
+
+  // Resolves to a page of programs and the next page's cursor; error bodies (e.g. 429 or 500) are rejected
+  const fetchPrograms = useCallback(async (cursor?: string) => {
+    const params = filterParams();
+
+    if (query) {
+      params.set('q', query);
+      params.set('limit', String(SEARCH_LIMIT));
+      const res = await fetch(`http://localhost:5000/api/programs/search?${params}`);
+      const data = await res.json();
+      if (!Array.isArray(data?.results)) {
+        throw new Error(data?.error ?? 'Unexpected response');
+      }
+      return { page: data.results as Program[], cursor: null };
+    }
+
+    params.set('limit', '60');
+    if (cursor) params.set('cursor', cursor);
+
+    const res = await fetch(`http://localhost:5000/api/programs?${params}`);
+    const data = await res.json();
+    if (!Array.isArray(data)) {
+      throw new Error(data?.error ?? 'Unexpected response');
+    }
+    return { page: data as Program[], cursor: res.headers.get('X-Next-Cursor') };
+  }, [filterParams, query]);
+
+  useEffect(() => {
+    const current = ++generation.current;
+    setLoadingMore(false);
+
+    fetchPrograms()
+      .then(({ page, cursor }) => {
+        if (current !== generation.current) return;
+        setPrograms(page);
+        setNextCursor(cursor);
       })
       .catch((error) => {
         console.error('Error fetching programs:', error);
-        setLoading(false);
+        if (current !== generation.current) return;
+        setPrograms([]);
+        setNextCursor(null);
+      })
+      .finally(() => {
+        if (current === generation.current) setLoading(false);
       });
-  }, []);
+  }, [fetchPrograms]);
+
+  useEffect(() => {
+    // Ignore responses for filters the user has already changed
+    let current = true;
+
+    fetch(`http://localhost:5000/api/programs/facets?${filterParams()}`)
+      .then((res) => res.json())
+      .then((data) => {
+        if (current) setFacets(data.facets ?? null);
+      })
+      .catch((error) => console.error('Error fetching facets:', error));
 
-  const filteredPrograms = programs.filter(program => {
-    const matchesSearch =
-      program.name.toLowerCase().includes(searchTerm.toLowerCase()) ||
-      program.description?.toLowerCase().includes(searchTerm.toLowerCase());
-    const matchesSport = selectedSport === 'all' || program.sport_type === selectedSport;
-    const matchesAge = selectedAge === 'all' || program.age_range === selectedAge;
+    return () => {
+      current = false;
+    };
+  }, [filterParams]);
 
-    return matchesSearch && matchesSport && matchesAge;
-  });
+  const loadMore = () => {
+    if (!nextCursor || loadingMore) return;
+    const current = generation.current;
+    setLoadingMore(true);
+    fetchPrograms(nextCursor)
+      .then(({ page, cursor }) => {
+        // A page of the previous filters must not be appended to the new results
+        if (current !== generation.current) return;
+        setPrograms((prev) => [...prev, ...page]);
+        setNextCursor(cursor);
+      })
+      .catch((error) => console.error('Error fetching programs:', error))
+      .finally(() => {
+        if (current === generation.current) setLoadingMore(false);
+      });
+  };
 
-  const sportTypes = ['all', ...Array.from(new Set(programs.map(p => p.sport_type).filter(Boolean)))];
-  const ageRanges = ['all', ...Array.from(new Set(programs.map(p => p.age_range).filter(Boolean)))];
+  const sportTypes = ['all', ...Object.keys(facets?.sport_type ?? {}).sort()];
+  const ageRanges = ['all', ...Object.keys(facets?.age_band ?? {})];
 
   if (loading) {
     return (
@@ -108,7 +197,7 @@ export default function Programs() {
                 >
                   {sportTypes.map(sport => (
                     <option key={sport} value={sport}>
-                      {sport === 'all' ? 'All Sports' : sport}
+                      {sport === 'all' ? 'All Sports' : `${sport} (${facets?.sport_type[sport]})`}
                     </option>
                   ))}
                 </select>
@@ -126,7 +215,7 @@ export default function Programs() {
                 >
                   {ageRanges.map(age => (
                     <option key={age} value={age}>
-                      {age === 'all' ? 'All Ages' : age}
+                      {age === 'all' ? 'All Ages' : `${age} (${facets?.age_band[age]})`}
                     </option>
                   ))}
                 </select>
@@ -135,7 +224,7 @@ export default function Programs() {
               {/* Results Count */}
               <div className="flex items-end">
                 <div className="text-sm text-gray-600">
-                  {filteredPrograms.length} program{filteredPrograms.length !== 1 ? 's' : ''} found
+                  {programs.length}{nextCursor ? '+' : ''} program{programs.length !== 1 || nextCursor ? 's' : ''} found
                 </div>
               </div>
             </div>
@@ -147,7 +236,7 @@ export default function Programs() {
       <section className="py-12">
         <div className="container mx-auto px-6 lg:px-12">
           <div className="grid md:grid-cols-2 lg:grid-cols-3 gap-6 mb-12">
-            {filteredPrograms.map((program) => (
+            {programs.map((program) => (
               <div key={program.id} className="bg-white rounded-lg shadow-lg overflow-hidden hover:shadow-xl transition-shadow duration-300">
                 <div className="p-6">
                   <div className="flex items-start justify-between mb-4">
@@ -200,8 +289,20 @@ export default function Programs() {
             ))}
           </div>
 
+          {nextCursor && (
+            <div className="text-center mb-12">
+              <button
+                onClick={loadMore}
+                disabled={loadingMore}
+                className="bg-blue-600 text-white px-6 py-2 rounded-md hover:bg-blue-700 transition-colors duration-200 disabled:opacity-50"
+              >
+                {loadingMore ? 'Loading...' : 'Load More Programs'}
+              </button>
+            </div>
+          )}
+
           {/* No Results */}
-          {filteredPrograms.length === 0 && (
+          {programs.length === 0 && (
             <div className="text-center py-12">
               <div className="text-6xl mb-4">🔍</div>
               <h3 className="text-xl font-semibold text-gray-900 mb-2">No programs found</h3>